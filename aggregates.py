@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""Define the precomputed aggregates of the data set."""
+
+import base64
+
+import numpy as np
+import pandas as pd
+
+from constants import ORGANISATIONS, RESEARCH_CATEGORIES
+
+# Bit of every research category in the category bitmask
+CATEGORY_BITS = {category: 1 << i for i, category in enumerate(RESEARCH_CATEGORIES)}
+
+# Key columns of the aggregate cube
+CUBE_KEYS = ['CategoryMask', 'PY', 'Organisation', 'CountryCode']
+
+
+def category_bitmask(frame):
+    """Encode the research categories of every row as one uint8 bitmask."""
+    mask = np.zeros(len(frame), dtype=np.uint8)
+    for category, bit in CATEGORY_BITS.items():
+        mask[frame[category].to_numpy().astype(bool)] |= bit
+    return mask
+
+
+def selection_bitmask(filter_categories):
+    """Combine the selected categories to one bitmask."""
+    selection = 0
+    for category in filter_categories:
+        selection |= CATEGORY_BITS[category]
+    return selection
+
+
+def filter_token(filter_categories, year_range):
+    """Encode a filter state as short token."""
+    return f'{selection_bitmask(filter_categories):02x}-{int(year_range[0])}-{int(year_range[1])}'
+
+
+def parse_filter_token(token):
+    """Decode a filter token to the selected categories and the year range, raise ValueError if invalid."""
+    selection, start, end = token.split('-')
+    selection = int(selection, 16)
+    return [category for category, bit in CATEGORY_BITS.items() if selection & bit], [int(start), int(end)]
+
+
+def index_frame(frame):
+    """Sort the rows by year and add the category bitmask column, unless the frame already is indexed."""
+    if not frame['PY'].is_monotonic_increasing:
+        # A stable sort keeps the original order within a year
+        frame = frame.sort_values('PY', kind='stable', ignore_index=True)
+    if 'CategoryMask' not in frame:
+        frame['CategoryMask'] = category_bitmask(frame)
+    return frame
+
+
+def year_slice(years, year_range):
+    """Find the row positions of a year range in the sorted years."""
+    start = np.searchsorted(years, year_range[0], side='left')
+    stop = np.searchsorted(years, year_range[1], side='right')
+    return start, stop
+
+
+def select_rows(frame, filter_categories, year_range):
+    """Select the rows of an indexed frame with one slice and one bitwise test."""
+    start, stop = year_slice(frame['PY'].to_numpy(), year_range)
+    rows = frame.iloc[start:stop]
+    return rows[(rows['CategoryMask'].to_numpy() & selection_bitmask(filter_categories)) != 0]
+
+
+def build_cube(frame):
+    """Count the publications of every combination of the cube keys."""
+    keys = frame[CUBE_KEYS]
+    # Only observed combinations are stored, missing ones are filled in again by the queries
+    return keys.groupby(CUBE_KEYS, observed=True, dropna=False).size().rename('Count').reset_index()
+
+
+def concat_frames(frames):
+    """Concatenate frames, categorical columns stay categorical with the union of their categories."""
+    frames = list(frames)
+    for column in frames[0].columns:
+        if not any(isinstance(frame[column].dtype, pd.CategoricalDtype) for frame in frames):
+            continue
+        values = [frame[column].astype('category') for frame in frames]
+        # Keep the order of the known categories, so the codes of the first frame stay valid
+        categories = values[0].cat.categories
+        for value in values[1:]:
+            categories = categories.append(value.cat.categories.difference(categories))
+        frames = [frame.assign(**{column: value.cat.set_categories(categories)})
+                  for frame, value in zip(frames, values)]
+    return pd.concat(frames, ignore_index=True)
+
+
+def merge_cubes(cubes):
+    """Add the cubes of parts of the rows, which equals the cube of all rows."""
+    merged = concat_frames(cubes)
+    return merged.groupby(CUBE_KEYS, observed=True, dropna=False)['Count'].sum().reset_index()
+
+
+def build_country_names(frame):
+    """Build the lookup table of the country name of every country code."""
+    names = frame[['CountryCode', 'Country']].dropna(subset=['CountryCode']).drop_duplicates('CountryCode')
+    return pd.Series(names['Country'].astype(object).to_numpy(), index=names['CountryCode'].astype(object).to_numpy())
+
+
+def encode_cube(cube):
+    """Sum the cube over the countries and encode it compactly for the clientside filtering."""
+    years = np.arange(cube['PY'].min(), cube['PY'].max() + 1)
+    organisations = pd.Categorical(cube['Organisation'], categories=ORGANISATIONS).codes
+    valid = organisations >= 0
+    # Counts by category bitmask, year and organisation as little-endian uint32
+    counts = np.zeros((1 << len(RESEARCH_CATEGORIES), len(years), len(ORGANISATIONS)), dtype='<u4')
+    np.add.at(counts, (cube['CategoryMask'].to_numpy()[valid],
+                       cube['PY'].to_numpy()[valid] - years[0],
+                       organisations[valid]), cube['Count'].to_numpy()[valid])
+    return {
+        'categories': RESEARCH_CATEGORIES,
+        'years': years.tolist(),
+        'organisations': ORGANISATIONS,
+        'counts': base64.b64encode(counts.tobytes()).decode('ascii')
+    }
+
+
+def query_cube(cube, filter_categories, year_range):
+    """Select the cells of the cube matching the filter."""
+    selection = selection_bitmask(filter_categories)
+    masks = cube['CategoryMask'].to_numpy()
+    years = cube['PY'].to_numpy()
+    return cube[((masks & selection) != 0) & (years >= year_range[0]) & (years <= year_range[1])]
+
+
+def count_category_organisations(cells):
+    """Count the organisation types of every research category, with zeros for categories without cells."""
+    masks = cells['CategoryMask'].to_numpy()
+    counts = pd.DataFrame({
+        category: cells[(masks & bit) != 0].groupby('Organisation', observed=False)['Count'].sum()
+        for category, bit in CATEGORY_BITS.items()
+    }).T
+    # Flatten categorical columns
+    counts.columns = counts.columns.tolist()
+    # A category without cells has NaN counts, the reindex only fills the missing organisation types
+    counts = counts.reindex(index=RESEARCH_CATEGORIES, columns=ORGANISATIONS, fill_value=0).fillna(0).astype(int)
+    counts['Total'] = counts.sum(axis='columns')
+    return counts
@@ -2,13 +2,38 @@
 """Define the Dash application."""
 
 import dash
-import pandas as pd
 
-from constants import DATASET_PATH
+from constants import (DATASET_PATH, DATASET_IPC_PATH, DATASET_REFRESH_INTERVAL, DATASET_ENGINE, CLIENTSIDE_FILTERING,
+                       BACKGROUND_CALLBACKS, BACKGROUND_CACHE_DIR, BACKGROUND_MAX_JOBS, FIGURE_CACHE_MODE,
+                       RESULT_STORE_MODE)
+from refresh import DatasetHolder
 
-# Import dataset
-df = pd.read_parquet(DATASET_PATH)
+# Import the used columns of the dataset, sorted by year and with the category bitmask column,
+# and the structures derived from it, which are swapped together when rows are added to the data set
+if DATASET_ENGINE != 'pandas' and CLIENTSIDE_FILTERING:
+    raise ValueError('The clientside filtering needs the cube of all years, which only the pandas engine builds')
+dataset = DatasetHolder(DATASET_PATH, DATASET_IPC_PATH, DATASET_REFRESH_INTERVAL, engine=DATASET_ENGINE)
+
+# Job queue of the background callbacks, kept on disk without an external broker
+if BACKGROUND_CALLBACKS:
+    # The jobs run in other processes, their figures and map data never reach the memory of the worker
+    if 'memory' in (FIGURE_CACHE_MODE, RESULT_STORE_MODE):
+        raise ValueError('The background callbacks need a figure cache and a map data store shared by the processes, '
+                         'set FIGURE_CACHE_MODE=disk and RESULT_STORE_MODE=file')
+    # Optional dependency of the background callbacks: pip install "dash[diskcache]"
+    import diskcache
+    background_cache = diskcache.Cache(BACKGROUND_CACHE_DIR)
+    background_manager = dash.DiskcacheManager(background_cache)
+    # Every job takes a slot of the queue, so the jobs of all workers spread over the cores without oversubscribing them.
+    # The counter is reset one minute after its last change, so the slots of terminated jobs are not lost
+    background_jobs = diskcache.BoundedSemaphore(background_cache, 'background-jobs', value=BACKGROUND_MAX_JOBS,
+                                                 expire=60)
+else:
+    background_manager = None
+    background_jobs = None
 
 # Create application instance
-app = dash.Dash(__name__, suppress_callback_exceptions=True)
+app = dash.Dash(__name__, suppress_callback_exceptions=True, background_callback_manager=background_manager)
 server = app.server
+# Check for changes of the data set between the requests
+server.before_request(dataset.maybe_refresh)
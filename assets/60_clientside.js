@@ -0,0 +1,96 @@
+/* Clientside filtering of the charts, used if CLIENTSIDE_FILTERING is enabled,
+   and the debouncing of the filters, used if LIVE_UPDATES is enabled */
+
+(function () {
+    // The decoded counts of the cube, decoding them again is only needed if the cube changed
+    let decoded = {encoded: null, counts: null};
+
+    function decodeCounts(cube) {
+        if (decoded.encoded !== cube.counts) {
+            const binary = atob(cube.counts);
+            const bytes = new Uint8Array(binary.length);
+            for (let i = 0; i < binary.length; i++) {
+                bytes[i] = binary.charCodeAt(i);
+            }
+            // The counts are little-endian uint32, indexed by category bitmask, year and organisation
+            decoded = {encoded: cube.counts, counts: new Uint32Array(bytes.buffer)};
+        }
+        return decoded.counts;
+    }
+
+    function withTraces(figure, traces) {
+        // Keep the layout of the figure shown and only replace the data arrays of its traces
+        return Object.assign({}, figure, {
+            data: figure.data.map((trace, i) => Object.assign({}, trace, traces[i]))
+        });
+    }
+
+    function filterCube(categories, yearRange, cube, histogram, pie, pieAll, pieAcademia, pieCompanies,
+                        pieCollaborations) {
+        const counts = decodeCounts(cube);
+        const numYears = cube.years.length;
+        const numOrgs = cube.organisations.length;
+        const numCategories = cube.categories.length;
+        let selection = 0;
+        (categories || []).forEach(category => {
+            selection |= 1 << cube.categories.indexOf(category);
+        });
+        const firstYear = Math.max(yearRange[0] - cube.years[0], 0);
+        const lastYear = Math.min(yearRange[1] - cube.years[0], numYears - 1);
+
+        const years = cube.years.slice(firstYear, lastYear + 1);
+        const yearCounts = cube.organisations.map(() => new Array(years.length).fill(0));
+        const orgCounts = new Array(numOrgs).fill(0);
+        const categoryCounts = cube.categories.map(() => new Array(numOrgs).fill(0));
+        for (let mask = 1; mask < (1 << numCategories); mask++) {
+            if ((mask & selection) === 0) {
+                continue;
+            }
+            for (let year = firstYear; year <= lastYear; year++) {
+                for (let org = 0; org < numOrgs; org++) {
+                    const count = counts[(mask * numYears + year) * numOrgs + org];
+                    yearCounts[org][year - firstYear] += count;
+                    orgCounts[org] += count;
+                    for (let category = 0; category < numCategories; category++) {
+                        if (mask & (1 << category)) {
+                            categoryCounts[category][org] += count;
+                        }
+                    }
+                }
+            }
+        }
+
+        // The token of the filter state, like aggregates.filter_token, for drawing the map on the server
+        const token = selection.toString(16).padStart(2, '0') + '-' + yearRange[0] + '-' + yearRange[1];
+        const categoryValues = org => categoryCounts.map(orgs => orgs[org]);
+        const orgIndex = name => cube.organisations.indexOf(name);
+        return [
+            withTraces(histogram, yearCounts.map(y => ({x: years, y: y}))),
+            withTraces(pie, [{values: orgCounts}]),
+            token,
+            withTraces(pieAll, [{values: categoryCounts.map(orgs => orgs.reduce((a, b) => a + b, 0))}]),
+            withTraces(pieAcademia, [{values: categoryValues(orgIndex('Academia'))}]),
+            withTraces(pieCompanies, [{values: categoryValues(orgIndex('Company'))}]),
+            withTraces(pieCollaborations, [{values: categoryValues(orgIndex('Collaboration'))}])
+        ];
+    }
+
+    // The pending update of the live filters, it is replaced by every further change
+    let liveTimer = null;
+
+    function debounceFilters(categories, yearRange, delay) {
+        // A drag of the slider changes the filters many times, only the last change is sent to the server
+        clearTimeout(liveTimer);
+        liveTimer = setTimeout(() => {
+            window.dash_clientside.set_props('live-filters', {data: {categories: categories, years: yearRange}});
+        }, delay);
+        return window.dash_clientside.no_update;
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        dashboard: Object.assign({}, (window.dash_clientside || {}).dashboard, {
+            filterCube: filterCube,
+            debounceFilters: debounceFilters
+        })
+    });
+})();
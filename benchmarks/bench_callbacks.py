@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the hot paths of the callbacks."""
+
+# Run this from the project directory with `python benchmarks/bench_callbacks.py`.
+# Store the results as baseline with `--save-baseline`,
+# later runs fail if a hot path regresses by more than the threshold.
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aggregates import build_cube, index_frame, query_cube, select_rows  # noqa: E402
+import app  # noqa: E402
+import callbacks  # noqa: E402
+from constants import DATASET_IPC_PATH, DATASET_PATH, RESEARCH_CATEGORIES  # noqa: E402
+from engines import make_engine  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+MAP_TAB = 'comp-acad-collab'
+
+
+def filter_states(years):
+    """Describe the filter states, from one category and few years to all categories and years."""
+    py_min, py_max = years
+    return {
+        'one-category-three-years': (['Technology'], [py_max - 2, py_max]),
+        'one-category-all-years': (['ArtsHumanities'], [py_min, py_max]),
+        'two-categories-ten-years': (['LifeSciencesBiomedicine', 'PhysicalSciences'], [py_max - 9, py_max]),
+        'all-categories-all-years': (RESEARCH_CATEGORIES, [py_min, py_max])
+    }
+
+
+def scale_frame(frame, factor, seed=0):
+    """Resample the rows of the real data set to a synthetic data set of factor times its size."""
+    if factor == 1:
+        return frame
+    rng = np.random.default_rng(seed)
+    # Sorted row positions keep the rows sorted by year
+    rows = np.sort(rng.integers(0, len(frame), size=len(frame) * factor))
+    return index_frame(frame.iloc[rows].reset_index(drop=True))
+
+
+def hot_paths(frame, cube, filter_categories, year_range):
+    """Prepare the calls of every benchmarked function for one filter state."""
+    cells = query_cube(cube, filter_categories, year_range)
+    country_names = app.dataset.snapshot.country_names
+    counts = callbacks.calc_country_org_count(cells, country_names)
+    return {
+        'select_rows': lambda: select_rows(frame, filter_categories, year_range),
+        'query_cube': lambda: query_cube(cube, filter_categories, year_range),
+        'calc_country_org_count': lambda: callbacks.calc_country_org_count(cells, country_names),
+        'draw_histogram': lambda: callbacks.draw_histogram(cells),
+        'draw_pie': lambda: callbacks.draw_pie(cells),
+        'draw_category_pies': lambda: callbacks.draw_category_pies(cells),
+        'draw_map': lambda: callbacks.draw_map_figure(MAP_TAB, counts)
+    }
+
+
+def measure(func, repeat):
+    """Measure the latency percentiles in ms and the peak memory in MB of a function."""
+    func()  # Warm up
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    # Tracing memory slows the function down, so the peak is measured in a separate run
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    p50, p90, p99 = np.percentile(durations, [50, 90, 99])
+    return {'p50_ms': p50, 'p90_ms': p90, 'p99_ms': p99, 'peak_mb': peak / 1024 ** 2}
+
+
+def run_benchmarks(scales, repeat):
+    """Benchmark all hot paths for every data set scale and filter state."""
+    results = {}
+    for factor in scales:
+        frame = scale_frame(app.dataset.snapshot.frame, factor)
+        cube = build_cube(frame)
+        dataset = f'{factor}x'
+        results[dataset] = {}
+        years = (int(frame['PY'].min()), int(frame['PY'].max()))
+        for state, (filter_categories, year_range) in filter_states(years).items():
+            for path, func in hot_paths(frame, cube, filter_categories, year_range).items():
+                result = measure(func, repeat)
+                results[dataset].setdefault(path, {})[state] = result
+                print(f"{dataset:>5} {path:<24} {state:<26} "
+                      f"p50 {result['p50_ms']:9.2f} ms  p90 {result['p90_ms']:9.2f} ms  "
+                      f"p99 {result['p99_ms']:9.2f} ms  peak {result['peak_mb']:8.2f} MB")
+    return results
+
+
+def run_engine_benchmarks(names, repeat):
+    """Benchmark the query and the row selection of every query engine on the real data set."""
+    results = {}
+    selected_rows = {}
+    for name in names:
+        try:
+            engine = make_engine(name, DATASET_PATH, DATASET_IPC_PATH, app.dataset.snapshot.parts)
+        except ImportError as error:
+            print(f'Skipping the {name} engine: {error}')
+            continue
+        dataset = f'engine-{name}'
+        results[dataset] = {}
+        for state, (filter_categories, year_range) in filter_states(engine.years).items():
+            # The arrow engine keeps the cubes of recent year ranges, so its queries are measured warm
+            paths = {
+                'query': lambda: engine.query(filter_categories, year_range),
+                'select': lambda: engine.select(filter_categories, year_range)
+            }
+            for path, func in paths.items():
+                result = measure(func, repeat)
+                results[dataset].setdefault(path, {})[state] = result
+                print(f"{dataset:>14} {path:<15} {state:<26} "
+                      f"p50 {result['p50_ms']:9.2f} ms  p90 {result['p90_ms']:9.2f} ms  "
+                      f"p99 {result['p99_ms']:9.2f} ms  peak {result['peak_mb']:8.2f} MB")
+            # All engines must select the same rows
+            rows = len(paths['select']())
+            if selected_rows.setdefault(state, rows) != rows:
+                raise AssertionError(f'The {name} engine selects {rows} rows in {state}, '
+                                     f'expected {selected_rows[state]}')
+    return results
+
+
+def find_regressions(results, baseline, threshold, min_delta_ms):
+    """List the results which are slower or need more memory than the baseline allows."""
+    regressions = []
+    for dataset, paths in results.items():
+        for path, states in paths.items():
+            for state, result in states.items():
+                base = baseline.get(dataset, {}).get(path, {}).get(state)
+                if base is None:
+                    continue
+                # Tiny absolute differences are measurement noise
+                if (result['p50_ms'] > base['p50_ms'] * (1 + threshold)
+                        and result['p50_ms'] - base['p50_ms'] > min_delta_ms):
+                    regressions.append(f"{dataset} {path} {state}: "
+                                       f"p50 {base['p50_ms']:.2f} -> {result['p50_ms']:.2f} ms")
+                if result['peak_mb'] > base['peak_mb'] * (1 + threshold) and result['peak_mb'] - base['peak_mb'] > 1:
+                    regressions.append(f"{dataset} {path} {state}: "
+                                       f"peak {base['peak_mb']:.2f} -> {result['peak_mb']:.2f} MB")
+    return regressions
+
+
+def main():
+    """Run the benchmarks and compare them with the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100],
+                        help='sizes of the data sets as multiples of the real data set')
+    parser.add_argument('--engines', nargs='*', default=['pandas'],
+                        help="query engines to benchmark: 'pandas', 'arrow', 'duckdb'")
+    parser.add_argument('--repeat', type=int, default=20, help='timed calls per function and filter state')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='path of the baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed relative regression')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help='ignored absolute latency regression')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.scales, args.repeat)
+    results.update(run_engine_benchmarks(args.engines, args.repeat))
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f'Saved baseline to {args.baseline}')
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}, run with --save-baseline first')
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    regressions = find_regressions(results, baseline, args.threshold, args.min_delta_ms)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
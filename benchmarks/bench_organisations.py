@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the organisation classifier against the former loop of the data processing."""
+
+# Run this from the project directory with `python benchmarks/bench_organisations.py`.
+# Both approaches classify the same synthetic affiliations and their results are compared.
+# The former loop tests every publication against the joined text, so it is only run on small data sets.
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench_affiliations import DATASET_DIR, RULES_PATH, synthetic_affiliations
+
+sys.path.insert(0, DATASET_DIR)
+
+from affiliations import AffiliationMatcher  # noqa: E402
+from organisations import classify_organisations  # noqa: E402
+
+
+def classify_loop(c1, c2, academic):
+    """Classify like the former data processing: one substring test of the joined C1 per publication."""
+    organisations = np.empty(len(c1), dtype=object)
+    for is_academic, organisation in [(False, 'Company'), (True, 'Academia')]:
+        rows = np.flatnonzero(academic == is_academic)
+        text = ' '.join(pd.unique(c1[rows]))
+        for row in rows:
+            if c2[row] is np.nan:
+                organisations[row] = organisation
+            elif all(word in text for word in (c1[row], c2[row])):
+                organisations[row] = organisation
+            else:
+                organisations[row] = 'Collaboration'
+    return organisations
+
+
+def main():
+    """Time both approaches on synthetic affiliations and check that their results are equal."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 30000], help='numbers of publications')
+    parser.add_argument('--distinct', type=int, default=5000, help='number of distinct affiliations')
+    args = parser.parse_args()
+
+    matcher = AffiliationMatcher.from_file(RULES_PATH)
+    for rows in args.rows:
+        # C1 always is set, a missing C2 is a publication with one affiliation
+        c1, academic = matcher.normalize(synthetic_affiliations(rows, args.distinct, seed=1).fillna('Google Inc'))
+        c2, _ = matcher.normalize(synthetic_affiliations(rows, args.distinct, seed=2))
+        c1 = c1.to_numpy(dtype=object)
+        c2 = c2.to_numpy(dtype=object)
+        start = time.perf_counter()
+        expected = classify_loop(c1, c2, academic)
+        loop_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        organisations = classify_organisations(c1, c2, academic)
+        classifier_seconds = time.perf_counter() - start
+        equal = np.array_equal(organisations, expected)
+        print(f'{rows:>9} rows  loop {loop_seconds:7.2f} s  classifier {classifier_seconds:7.2f} s  '
+              f'speedup {loop_seconds / classifier_seconds:5.1f}x  equal results: {equal}')
+        if not equal:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
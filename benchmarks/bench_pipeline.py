@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the chunked pipeline against the in-memory stages of the data processing."""
+
+# Run this from the project directory with `python benchmarks/bench_pipeline.py`.
+# Both process the same synthetic dump and their rows are compared. The last chunk of the dump has no C1,
+# so it is empty after dropping the publications without affiliation.
+# The chunked pipeline runs with every number of --workers, which must all give the same rows in the same order.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench_affiliations import DATASET_DIR, PREFIXES, RULES_PATH, SUFFIXES
+
+sys.path.insert(0, DATASET_DIR)
+
+from affiliations import AffiliationMatcher  # noqa: E402
+from organisations import classify_organisations  # noqa: E402
+import pipeline  # noqa: E402
+
+SHARE_COLUMNS = ['ArtsHumanities', 'LifeSciencesBiomedicine', 'PhysicalSciences', 'SocialSciences', 'Technology']
+
+
+def synthetic_dump(rows, chunk_size, seed=0):
+    """Generate the publications of a dump and the countries of their affiliations."""
+    rng = np.random.default_rng(seed)
+    names = [f'{PREFIXES[i % len(PREFIXES)]} {SUFFIXES[i * 7 % len(SUFFIXES)]}, City {i}' for i in range(500)]
+    papers = pd.DataFrame({'UT': [f'WOS{i}' for i in rng.integers(0, rows // 2, rows)]})
+    papers['PY'] = rng.integers(1990, 2019, rows)
+    papers['SC'] = rng.choice(['Computer Science', 'Engineering', 'Mathematics'], rows)
+    for column in SHARE_COLUMNS:
+        papers[column] = rng.random(rows).round(3)
+    papers['ComputerScience'] = rng.integers(0, 2, rows)
+    papers['Health'] = rng.integers(0, 2, rows)
+    papers['NR'] = rng.integers(0, 100, rows)
+    papers['TCperYear'] = rng.random(rows).round(3)
+    papers['nb_aut'] = rng.integers(1, 10, rows)
+    papers['C1'] = ['; '.join(('[Author] ' if rng.random() < 0.2 else '') + name
+                              for name in rng.choice(names, rng.integers(1, 4))) for _ in range(rows)]
+    papers.loc[rng.random(rows) < 0.05, 'C1'] = np.nan
+    # The last chunk is empty after dropping the publications without affiliation
+    papers.loc[(rows - 1) // chunk_size * chunk_size:, 'C1'] = np.nan
+    # Some abstracts repeat, also across chunks
+    papers['AB'] = [f'Abstract {i}' for i in rng.integers(0, int(rows * 0.8), rows)]
+    publications = papers['UT'].unique()
+    countries = pd.DataFrame({
+        'UT': np.repeat(publications, 2),
+        'nb_aut_aff': 1,
+        'Region': rng.choice(['Western Europe', 'North America'], 2 * len(publications)),
+        'C1': rng.choice(['France', 'Germany', 'USA'], 2 * len(publications))
+    })
+    countries['Country'] = countries['C1']
+    countries['CountryCode'] = countries['C1'].str[:3].str.upper()
+    return papers, countries
+
+
+def process_in_memory(path, matcher, dl_country):
+    """Process the dump like data_processing.py, all rows at once."""
+    papers = pd.read_csv(path, sep='\t')
+    papers = papers.dropna(subset=['C1']).drop_duplicates(subset=['AB']).reset_index()
+    papers['C1'], papers['C2'] = pipeline.split_affiliations(papers['C1'])
+    papers['C1'], academic = matcher.normalize(papers['C1'])
+    papers['C2'], _ = matcher.normalize(papers['C2'])
+    papers['Organisation'] = classify_organisations(papers['C1'].to_numpy(), papers['C2'].to_numpy(), academic)
+    final_df = pipeline.add_countries(papers[pipeline.PAPER_COLUMNS], dl_country)
+    return final_df.drop_duplicates()
+
+
+def process_chunked(path, chunk_size, matcher, dl_country, workers):
+    """Process the dump with the stages of pipeline.py, chunk by chunk."""
+    indexes = pipeline.collect_affiliations(path, chunk_size, matcher, workers)
+    lookups = {'matcher': matcher, 'indexes': indexes, 'dl_country': dl_country}
+    seen_rows = pipeline.SeenHashes()
+    chunks = pipeline.unique_chunks(path, chunk_size, list(pipeline.PAPER_DTYPES))
+    return pd.concat([pipeline.finish_chunk(final_df, seen_rows)
+                      for final_df in pipeline.ordered_map(pipeline.classify_chunk, chunks, workers, lookups)],
+                     ignore_index=True)
+
+
+def normalized(frame):
+    """Compare the rows independent of their order and the column types."""
+    frame = frame.astype(object).astype(str)
+    return frame.sort_values(list(frame.columns), ignore_index=True)
+
+
+def main():
+    """Time both approaches on a synthetic dump and check that their rows are equal."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=20000, help='number of publications of the dump')
+    parser.add_argument('--chunk-size', type=int, default=3000, help='rows per chunk')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4], help='numbers of worker processes')
+    args = parser.parse_args()
+
+    matcher = AffiliationMatcher.from_file(RULES_PATH)
+    papers, dl_country = synthetic_dump(args.rows, args.chunk_size)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'papers.tsv')
+        papers.to_csv(path, sep='\t', index=False)
+        start = time.perf_counter()
+        expected = process_in_memory(path, matcher, dl_country)
+        memory_seconds = time.perf_counter() - start
+        print(f'{len(expected):>9} rows  in memory {memory_seconds:7.2f} s')
+        first = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            result = process_chunked(path, args.chunk_size, matcher, dl_country, workers)
+            chunked_seconds = time.perf_counter() - start
+            equal = normalized(result[expected.columns]).equals(normalized(expected))
+            # The order of the rows must not depend on the number of workers either
+            first = result if first is None else first
+            same_order = result.astype(object).equals(first.astype(object))
+            print(f'{workers:>9} workers  chunked {chunked_seconds:7.2f} s  equal results: {equal}  '
+                  f'same order: {same_order}')
+            if not (equal and same_order):
+                return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
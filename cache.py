@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""Define the caches of the rendered callback outputs."""
+
+import functools
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from plotly.utils import PlotlyJSONEncoder
+
+
+# Returned by the caches for missing keys, so cached None and empty outputs are hits
+MISSING = object()
+
+
+def serialize(value):
+    """Serialize callback outputs (figures, strings and lists of them) to JSON once."""
+    return json.dumps(value, cls=PlotlyJSONEncoder)
+
+
+def estimate_size(value):
+    """Estimate the JSON size of callback outputs (figures, patches, strings and lists) without encoding them."""
+    if hasattr(value, 'to_plotly_json'):
+        value = value.to_plotly_json()
+    if isinstance(value, dict):
+        return sum(len(str(key)) + estimate_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(item) for item in value)
+    if isinstance(value, np.ndarray) and value.dtype != object:
+        return value.nbytes
+    if isinstance(value, np.ndarray):
+        return estimate_size(value.tolist())
+    if isinstance(value, str):
+        return len(value)
+    # Numbers, booleans and None
+    return 8
+
+
+class MemoryCache:
+    """Bounded LRU cache of outputs, private to the worker process."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value or MISSING and mark it as recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # The outputs are kept as they were returned, a hit neither parses nor copies them.
+        # Dash still encodes them for the response, the callers must not modify them.
+        return entry[0]
+
+    def set(self, key, value):
+        """Store a value and evict the least recently used entries above the size limit."""
+        # The values are kept unencoded, so their size is estimated instead of encoding them a second time
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self.evictions += 1
+
+    def stats(self):
+        """Return the counters of the cache."""
+        return {
+            'mode': 'memory',
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'bytes': self._size
+        }
+
+
+class DiskCache:
+    """Bounded LRU cache of serialized outputs in a directory shared by all workers, a hit parses the file."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        """Map a key to its file name."""
+        return os.path.join(self.directory, hashlib.sha1(repr(key).encode()).hexdigest() + '.json')
+
+    def get(self, key):
+        """Return the cached value or MISSING and mark it as recently used."""
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as file:
+                payload = file.read()
+            # The modification time is used as last access time
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        return json.loads(payload)
+
+    def set(self, key, value):
+        """Store a value and evict the least recently used files above the size limit."""
+        payload = serialize(value)
+        if len(payload) > self.max_bytes:
+            return
+        path = self._path(key)
+        # Write to a temporary file first, so other workers never read a partial file
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            file.write(payload)
+        os.replace(temp_path, path)
+        self._evict()
+
+    def _evict(self):
+        """Delete the oldest files until the directory fits the size limit."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        size = sum(entry[1] for entry in entries)
+        for _, file_size, path in sorted(entries):
+            if size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except OSError:
+                # Another worker already evicted it
+                pass
+            size -= file_size
+
+    def stats(self):
+        """Return the counters of this worker and the shared directory size."""
+        sizes = [entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith('.json')]
+        return {
+            'mode': 'disk',
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(sizes),
+            'bytes': sum(sizes)
+        }
+
+
+def make_cache(mode, directory, max_bytes):
+    """Create the cache for the configured mode, 'off' disables caching."""
+    if mode == 'memory':
+        return MemoryCache(max_bytes)
+    elif mode == 'disk':
+        return DiskCache(directory, max_bytes)
+    elif mode == 'off':
+        return None
+    raise ValueError(f"Unknown cache mode '{mode}', use 'memory', 'disk' or 'off'")
+
+
+def memoize(cache, make_key):
+    """Decorate a callback to look its outputs up in the cache first."""
+    def decorator(func):
+        if cache is None:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            key = make_key(*args)
+            value = cache.get(key)
+            if value is MISSING:
+                value = func(*args)
+                cache.set(key, value)
+            return value
+        return wrapper
+    return decorator
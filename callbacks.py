@@ -1,318 +1,380 @@
 # -*- coding: utf-8 -*-
 """Define the callbacks of the Dash application."""
 
-from dash.dependencies import Input, Output, State
-import plotly.express as px
-import pandas as pd
+import functools
+import threading
+from collections import OrderedDict
+
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from dash.exceptions import PreventUpdate
+from flask import Response, jsonify
 import numpy as np
 
-from app import app, df
-from constants import COLOR_MAP, LABELS, RESEARCH_CATEGORIES
+from aggregates import count_category_organisations, filter_token, parse_filter_token
+from app import app, background_jobs, dataset
+from cache import make_cache, memoize
+from constants import (COLOR_MAP, ORGANISATIONS, CLIENTSIDE_FILTERING, LIVE_UPDATES,
+                       BACKGROUND_CALLBACKS, BACKGROUND_POLL_INTERVAL,
+                       FIGURE_CACHE_MODE, FIGURE_CACHE_DIR, FIGURE_CACHE_MAX_BYTES, RESULT_STORE_MODE,
+                       RESULT_STORE_DIR, RESULT_STORE_TTL)
+from figures import (MAP_TABS, base_map, category_pie_templates, fill_figure, histogram_template,
+                     map_hover_template, patch_figure, pie_template)
+from metrics import install, instrument, metrics, phase
+from preload import private_memory
+from sessions import SessionRequests, checkpoint
+from store import make_store
+
+# Columns of the publication fractions, in the order they are calculated
+FRACTION_COLUMNS = [
+    'CompanyAcademiaFraction',
+    'CompanyCollaborationFraction',
+    'CollaborationAcademiaFraction',
+    'CompanyAcademiaCollabFraction'
+]
 
-# Set alternative color scheme
-color_list = px.colors.qualitative.Antique
-# Move grey to fifth position
-color_list.insert(4, color_list.pop(10))
+# Cache of the rendered figures, keyed by the normalized filter state
+figure_cache = make_cache(FIGURE_CACHE_MODE, FIGURE_CACHE_DIR, FIGURE_CACHE_MAX_BYTES)
+# Store of the map data, the browser only holds the filter token
+result_store = make_store(RESULT_STORE_MODE, RESULT_STORE_DIR, RESULT_STORE_TTL)
+# Newest live update request of every session
+live_requests = SessionRequests()
+# Filtered cells of the recent filter states, keyed by the data set version and the filter token
+CELLS_CACHE_SIZE = 64
+cells_cache = OrderedDict()
+cells_lock = threading.Lock()
 
 
 # --- HELPER FUNCTIONS ---
 
-def filter_dataframe(filter_categories, year_range):
-    """Init mask with only False values, add selected categories and filter by year range."""
-    mask = pd.Series(index=df.index, dtype=bool)
-    for category in filter_categories:
-        mask = mask | df[category].astype(bool)
-    return df[mask & (df['PY'] >= year_range[0]) & (df['PY'] <= year_range[1])]
+def charts_cache_key(chart, snapshot, _n_clicks, filter_categories, year_range):
+    """Normalize the filter state, so equal selections share one cache entry per chart and data set version."""
+    return chart, snapshot.version, tuple(sorted(filter_categories or [])), tuple(year_range)
+
+
+def map_cache_key(snapshot, tab, token):
+    """Identify the map by the tab, the data set version and the filter token."""
+    return 'map', snapshot.version, tab, token
+
+
+def with_snapshot(update):
+    """Pass the current snapshot of the data set to a callback, which uses it for the whole request."""
+    # A refresh may swap the snapshot while the callback runs, it must not mix the data of two versions
+    @functools.wraps(update)
+    def update_snapshot(*args):
+        return update(dataset.snapshot, *args)
+    return update_snapshot
+
+
+def query_snapshot(snapshot, token):
+    """Query the cells of a filter token once per data set version, the chart callbacks of one change share them."""
+    # The cells are keyed by the version, so the cache does not keep replaced snapshots alive
+    key = snapshot.version, token
+    with cells_lock:
+        if key in cells_cache:
+            cells_cache.move_to_end(key)
+            return cells_cache[key]
+    filter_categories, year_range = parse_filter_token(token)
+    cells = snapshot.query(filter_categories, year_range)
+    with cells_lock:
+        cells_cache[key] = cells
+        while len(cells_cache) > CELLS_CACHE_SIZE:
+            cells_cache.popitem(last=False)
+    return cells
+
+
+def load_cells(snapshot, filter_categories, year_range):
+    """Look the filtered cells of the filter state up, the callbacks must not modify them."""
+    with phase('filter'):
+        cells = query_snapshot(snapshot, filter_token(filter_categories, year_range))
+    checkpoint()
+    return cells
+
+
+def store_key(snapshot, token):
+    """Identify the map data of a filter token in a data set version."""
+    return f'{snapshot.version}-{token}'
+
+
+def load_country_org_count(snapshot, token):
+    """Look the counts of a filter token up in the result store or recalculate them, if they expired."""
+    try:
+        filter_categories, year_range = parse_filter_token(token)
+    except (AttributeError, ValueError):
+        raise PreventUpdate
+    # Encoding the parsed state again only lets well-formed tokens reach the store
+    token = filter_token(filter_categories, year_range)
+    with phase('aggregate'):
+        counts = result_store.get(store_key(snapshot, token))
+        if counts is None:
+            counts = calc_country_org_count(query_snapshot(snapshot, token), snapshot.country_names)
+            result_store.put(store_key(snapshot, token), counts)
+    return counts
 
 
-def calc_country_org_count(dff):
+def calc_country_org_count(cells, country_names):
     """Calculate the count of organisation by country."""
     # Count of organisation by country
-    counts = dff.groupby(['CountryCode', 'Organisation']).size().unstack()
-    # Flatten hierarchical columns
+    counts = cells.groupby(['CountryCode', 'Organisation'], observed=False)['Count'].sum().unstack(fill_value=0)
+    # Flatten hierarchical columns, organisation types without publications are counted as zero
     counts.columns = counts.columns.tolist()
-    # Add country names from dataset
-    counts = counts.merge(
-        dff[['CountryCode', 'Country']],
-        how='left',
-        on='CountryCode'
-    ).drop_duplicates().reset_index(drop=True)
-    # Calculate fractions
-    counts['CompanyAcademiaFraction'] = 100 / (
-            counts['Academia'] / counts['Company'] + 1)
-    counts['CompanyCollaborationFraction'] = 100 / (
-            counts['Collaboration'] / counts['Company'] + 1)
-    counts['CollaborationAcademiaFraction'] = 100 / (
-            counts['Academia'] / counts['Collaboration'] + 1)
-    counts['CompanyAcademiaCollabFraction'] = 100 / ((
-            counts['Academia'] +
-            counts['Collaboration']
-        ) / (
-            counts['Company'] +
-            counts['Collaboration']
-        ) + 1)
+    counts = counts.reindex(columns=ORGANISATIONS, fill_value=0)
+    # Add country names from the lookup table
+    counts['Country'] = country_names.reindex(np.asarray(counts.index)).to_numpy()
+    counts = counts.reset_index()
+    # Calculate all fractions in one step: numerator / (numerator + other organisation types) in percent
+    academia, company, collaboration = counts[ORGANISATIONS].to_numpy(dtype=float).T
+    numerators = np.column_stack([company, company, collaboration, company + collaboration])
+    denominators = numerators + np.column_stack([academia, collaboration, academia, academia + collaboration])
+    # The fraction is undefined (NaN) and not colored, if a country has no publications of the compared types
+    fractions = np.divide(100 * numerators, denominators,
+                          out=np.full(numerators.shape, np.nan), where=denominators > 0)
+    for column, values in zip(FRACTION_COLUMNS, fractions.T):
+        counts[column] = values
     return counts
 
 
-def draw_histogram(dff):
+def draw_histogram(cells):
     """Draw the histogram chart."""
     # Count of organisation by year
-    year_org_count = pd.DataFrame({'Count': dff.groupby(['PY', 'Organisation']).size()}).reset_index()
-
-    fig = px.bar(
-        year_org_count,
-        x='PY',
-        y='Count',
-        barmode='group',
-        color='Organisation',
-        color_discrete_map=COLOR_MAP,
-        labels=LABELS,
-        title='Publications of Organisations by Year'
-    ).update_layout(
-        title_x=0.5
-    )
+    with phase('aggregate'):
+        year_org_count = cells.groupby(['PY', 'Organisation'], observed=False)['Count'].sum().unstack(fill_value=0)
+        # Flatten categorical columns
+        year_org_count.columns = year_org_count.columns.tolist()
+        year_org_count = year_org_count.reindex(columns=ORGANISATIONS, fill_value=0)
+
+    with phase('figure'):
+        years = year_org_count.index.to_numpy()
+        fig = fill_figure(histogram_template, [
+            {'x': years, 'y': year_org_count[organisation].to_numpy()}
+            for organisation in ORGANISATIONS
+        ])
     return fig
 
 
-def draw_pie(dff):
+def draw_pie(cells):
     """Draw the pie chart."""
     # Count of organisation
-    org_count = pd.DataFrame({'Count': dff.groupby(['Organisation']).size()}).reset_index()
-
-    fig = px.pie(
-        org_count,
-        values='Count',
-        names='Organisation',
-        color='Organisation',
-        color_discrete_map=COLOR_MAP,
-        title='Distribution of Publications'
-    ).update_layout(
-        title_x=0.5
-    )
+    with phase('aggregate'):
+        org_count = cells.groupby('Organisation', observed=False)['Count'].sum()
+        # Flatten categorical index
+        org_count.index = org_count.index.tolist()
+        org_count = org_count.reindex(ORGANISATIONS, fill_value=0)
+
+    with phase('figure'):
+        fig = fill_figure(pie_template, [{'values': org_count.to_numpy()}])
     return fig
 
 
-def draw_category_pies(dff):
+def draw_category_pies(cells):
     """Draw the category pie charts."""
-    # Count of organisation type for each category
-    category_org_count = dff[[
-        *RESEARCH_CATEGORIES,
-        'Organisation'
-    ]].replace(0, np.nan).groupby('Organisation').agg('count').T
-    # Flatten categorical columns
-    category_org_count.columns = category_org_count.columns.tolist()
-    # Set names properly and reset the index
-    category_org_count['Total'] = category_org_count.sum(axis='columns')
-    category_org_count = category_org_count.reset_index().rename({'index': 'Category'}, axis='columns').replace(LABELS)
-
-    pie_cat_all = px.pie(
-        category_org_count,
-        values='Total',
-        names='Category',
-        color='Category',
-        color_discrete_sequence=color_list,
-        labels=LABELS,
-        title='Overall Distribution'
-    ).update_layout(
-        title_x=0.5
-    )
+    # Count of organisation type for each category, using the category bits of the cube
+    with phase('aggregate'):
+        category_org_count = count_category_organisations(cells)
 
-    pie_cat_academia = px.pie(
-        category_org_count,
-        values='Academia',
-        names='Category',
-        color='Category',
-        color_discrete_sequence=color_list,
-        labels=LABELS,
-        title='Academia'
-    ).update_layout(
-        showlegend=False,
-        title_x=0.5
-    )
+    with phase('figure'):
+        # The rows are in the order of the research categories, like the labels of the templates
+        figs = [fill_figure(template, [{'values': category_org_count[column].to_numpy()}])
+                for column, template in category_pie_templates.items()]
+    return figs
 
-    pie_cat_companies = px.pie(
-        category_org_count,
-        values='Company',
-        names='Category',
-        color='Category',
-        color_discrete_sequence=color_list,
-        labels=LABELS,
-        title='Companies'
-    ).update_layout(
-        showlegend=False,
-        title_x=0.5
-    )
 
-    pie_cat_collaborations = px.pie(
-        category_org_count,
-        values='Collaboration',
-        names='Category',
-        color='Category',
-        color_discrete_sequence=color_list,
-        labels=LABELS,
-        title='Collaborations'
-    ).update_layout(
-        showlegend=False,
-        title_x=0.5
-    )
-    return [pie_cat_all, pie_cat_academia, pie_cat_companies, pie_cat_collaborations]
+def draw_map_figure(tab, country_org_count):
+    """Draw the choropleth map of a tab from the counts of organisation by country."""
+    settings = MAP_TABS[tab]
+    low_color, high_color = settings['colors']
+
+    # Only fill in the data of the trace and the color axis of the tab, the rest is shared
+    trace = {
+        **base_map['data'][0],
+        'locations': country_org_count['CountryCode'].to_numpy(),
+        'z': country_org_count[settings['column']].to_numpy(),
+        'hovertext': country_org_count['Country'].to_numpy(),
+        'customdata': country_org_count[ORGANISATIONS].to_numpy(),
+        'hovertemplate': map_hover_template(settings['column'])
+    }
+    layout = {
+        **base_map['layout'],
+        'title': {**base_map['layout']['title'], 'text': settings['title']},
+        'coloraxis': {
+            **base_map['layout']['coloraxis'],
+            'colorscale': [[0, COLOR_MAP[low_color]], [1, COLOR_MAP[high_color]]],
+            'cmin': settings['range'][0],
+            'cmax': settings['range'][1],
+            'colorbar': {**base_map['layout']['coloraxis']['colorbar'], 'title': {'text': settings['colorbar']}}
+        }
+    }
+    return {'data': [trace], 'layout': layout}
 
 
 # --- CALLBACKS ---
 
+def background_options(running=None):
+    """Run a callback in a background process, if enabled, the browser polls for its progress and result."""
+    if not BACKGROUND_CALLBACKS:
+        return {}
+    return {'background': True, 'interval': BACKGROUND_POLL_INTERVAL, 'running': running}
+
+
+def background_slot(function):
+    """Wait for a free slot of the background jobs, so at most BACKGROUND_MAX_JOBS of them compute at once."""
+    if background_jobs is None:
+        return function
+
+    @functools.wraps(function)
+    def wrapper(*args):
+        with background_jobs:
+            return function(*args)
+    return wrapper
+
+
+# Only the map is slow enough to be worth a process and the polls of the browser,
+# the other charts are answered faster in the worker thread
 @app.callback(Output('choropleth-map', 'figure'),
               Input('map-tabs', 'value'),
-              Input('map-data', 'children'))
-def draw_map(tab, counts_json):
-    """Draw the four different choropleth maps."""
-    # Import jsonified saved map-data
-    country_org_count = pd.read_json(counts_json, orient='split')
-
-    choro_map_comp_acad = px.choropleth(
-        country_org_count,
-        locations='CountryCode',
-        color='CompanyAcademiaFraction',
-        hover_name='Country',
-        hover_data=['Academia', 'Company', 'Collaboration'],
-        labels=LABELS,
-        color_continuous_scale=[
-            (0, COLOR_MAP['Academia']),
-            (1, COLOR_MAP['Company'])
-        ],
-        range_color=[0, 20],
-        title='Company to Academia Publication Fractions',
-        center={'lat': 20}
-    ).update_layout(
-        title_x=0.5,
-        height=800,
-        coloraxis_colorbar=dict(
-            title='Company Fraction',
-            ticks='outside',
-            ticksuffix='%'
-        )
-    ).update_geos(
-        visible=False,
-        showland=True,
-        landcolor='#ccc',
-        showcoastlines=True,
-        projection_type='natural earth'
-    )
+              Input('map-data', 'children'),
+              **background_options(running=[(Output('map-progress', 'children'), 'Drawing the map ...', '')]))
+@background_slot
+@instrument('draw_map')
+@with_snapshot
+@memoize(figure_cache, map_cache_key)
+def draw_map(snapshot, tab, token):
+    """Draw the choropleth map of the selected tab."""
+    if tab not in MAP_TABS:
+        return None
+    # Load the map-data saved on the server
+    country_org_count = load_country_org_count(snapshot, token)
+    with phase('figure'):
+        # The map shell in the layout is the base map, only the tab specific parts are sent
+        return patch_figure(draw_map_figure(tab, country_org_count), base_map)
 
-    choro_map_comp_collab = px.choropleth(
-        country_org_count,
-        locations='CountryCode',
-        color='CompanyCollaborationFraction',
-        hover_name='Country',
-        hover_data=['Academia', 'Company', 'Collaboration'],
-        labels=LABELS,
-        color_continuous_scale=[
-            (0, COLOR_MAP['Collaboration']),
-            (1, COLOR_MAP['Company'])
-        ],
-        range_color=[0, 16],
-        title='Company to Collaboration Publication Fractions',
-        center={'lat': 20}
-    ).update_layout(
-        title_x=0.5,
-        height=800,
-        coloraxis_colorbar=dict(
-            title='Company Fraction',
-            ticks='outside',
-            ticksuffix='%'
-        )
-    ).update_geos(
-        visible=False,
-        showland=True,
-        landcolor='#ccc',
-        showcoastlines=True,
-        projection_type='natural earth'
-    )
 
-    choro_map_collab_acad = px.choropleth(
-        country_org_count,
-        locations='CountryCode',
-        color='CollaborationAcademiaFraction',
-        hover_name='Country',
-        hover_data=['Academia', 'Company', 'Collaboration'],
-        labels=LABELS,
-        color_continuous_scale=[
-            (0, COLOR_MAP['Academia']),
-            (1, COLOR_MAP['Collaboration'])
-        ],
-        range_color=[40, 100],
-        title='Collaboration to Academia Publication Fractions',
-        center={'lat': 20}
-    ).update_layout(
-        title_x=0.5,
-        height=800,
-        coloraxis_colorbar=dict(
-            title='Collabor. Fraction',
-            ticks='outside',
-            ticksuffix='%'
-        )
-    ).update_geos(
-        visible=False,
-        showland=True,
-        landcolor='#ccc',
-        showcoastlines=True,
-        projection_type='natural earth'
-    )
+# Every chart family has its own callback, so they run in parallel requests
+# and each loading spinner resolves as soon as its own chart is ready
+
+@instrument('update_histogram')
+@memoize(figure_cache, functools.partial(charts_cache_key, 'histogram'))
+def update_histogram(snapshot, _n_clicks, filter_categories, year_range):
+    """Update the histogram of the publications by year."""
+    cells = load_cells(snapshot, filter_categories, year_range)
+    # Only send the data arrays, the static parts of the figures already are in the layout
+    return patch_figure(draw_histogram(cells), histogram_template)
+
+
+@instrument('update_pie')
+@memoize(figure_cache, functools.partial(charts_cache_key, 'pie'))
+def update_pie(snapshot, _n_clicks, filter_categories, year_range):
+    """Update the pie chart of the organisations."""
+    cells = load_cells(snapshot, filter_categories, year_range)
+    return patch_figure(draw_pie(cells), pie_template)
+
+
+@instrument('update_map_data')
+@memoize(figure_cache, functools.partial(charts_cache_key, 'map-data'))
+def update_map_data(snapshot, _n_clicks, filter_categories, year_range):
+    """Calculate the map data and output its token, which triggers drawing the map."""
+    cells = load_cells(snapshot, filter_categories, year_range)
+    # Keep the map data on the server and only send its token to the browser
+    token = filter_token(filter_categories, year_range)
+    with phase('aggregate'):
+        result_store.put(store_key(snapshot, token), calc_country_org_count(cells, snapshot.country_names))
+    return token
+
+
+@instrument('update_category_pies')
+@memoize(figure_cache, functools.partial(charts_cache_key, 'category-pies'))
+def update_category_pies(snapshot, _n_clicks, filter_categories, year_range):
+    """Update the pie charts of the research categories."""
+    cells = load_cells(snapshot, filter_categories, year_range)
+    return [patch_figure(fig, template)
+            for fig, template in zip(draw_category_pies(cells), category_pie_templates.values())]
 
-    choro_map_comp_acad_collab = px.choropleth(
-        country_org_count,
-        locations='CountryCode',
-        color='CompanyAcademiaCollabFraction',
-        hover_name='Country',
-        hover_data=['Academia', 'Company', 'Collaboration'],
-        labels=LABELS,
-        color_continuous_scale=[
-            (0, COLOR_MAP['Academia']),
-            (1, COLOR_MAP['Company'])
-        ],
-        range_color=[30, 50],
-        title='Company to Academia Publication Fractions (Collab. count for both)',
-        center={'lat': 20}
-    ).update_layout(
-        title_x=0.5,
-        height=800,
-        coloraxis_colorbar=dict(
-            title='Company Fraction',
-            ticks='outside',
-            ticksuffix='%'
-        )
-    ).update_geos(
-        visible=False,
-        showland=True,
-        landcolor='#ccc',
-        showcoastlines=True,
-        projection_type='natural earth'
+
+# Outputs of the chart callbacks, the charts are filtered on the server or in the browser
+CHART_CALLBACKS = [
+    ([Output('histogram-year', 'figure')], update_histogram),
+    ([Output('pie-org', 'figure')], update_pie),
+    ([Output('map-data', 'children')], update_map_data),
+    ([Output('pie-cat-all', 'figure'),
+      Output('pie-cat-academia', 'figure'),
+      Output('pie-cat-companies', 'figure'),
+      Output('pie-cat-collaborations', 'figure')], update_category_pies)
+]
+
+
+@instrument('update_live')
+def update_live(filters, session_id):
+    """Update all charts on a change of the filters, if no newer request of the session arrived."""
+    # One request computes all charts, so a session keeps at most one computation busy
+    with live_requests.latest(session_id):
+        # All charts of the request are drawn from the same snapshot
+        snapshot = dataset.snapshot
+        values = []
+        for outputs, update in CHART_CALLBACKS:
+            value = update(snapshot, None, filters['categories'], filters['years'])
+            values.extend(value if len(outputs) > 1 else [value])
+        return values
+
+
+if CLIENTSIDE_FILTERING:
+    # Filter the cube of the layout in the browser on every change of the filters,
+    # only the map data token is sent to the server for drawing the map
+    app.clientside_callback(
+        ClientsideFunction(namespace='dashboard', function_name='filterCube'),
+        *[output for outputs, _ in CHART_CALLBACKS for output in outputs],
+        Input('category-filter', 'value'),
+        Input('year-slider', 'value'),
+        State('cube-data', 'data'),
+        State('histogram-year', 'figure'),
+        State('pie-org', 'figure'),
+        State('pie-cat-all', 'figure'),
+        State('pie-cat-academia', 'figure'),
+        State('pie-cat-companies', 'figure'),
+        State('pie-cat-collaborations', 'figure')
+    )
+elif LIVE_UPDATES:
+    # Debounce the changes of the filters in the browser, so a drag of the slider sends one request
+    app.clientside_callback(
+        ClientsideFunction(namespace='dashboard', function_name='debounceFilters'),
+        Output('live-filters', 'data'),
+        Input('category-filter', 'value'),
+        Input('year-slider', 'value'),
+        State('live-debounce', 'data'),
+        prevent_initial_call=True
     )
+    app.callback(*[output for outputs, _ in CHART_CALLBACKS for output in outputs],
+                 Input('live-filters', 'data'),
+                 State('session-id', 'data'))(update_live)
+else:
+    for outputs, update in CHART_CALLBACKS:
+        callback, options = with_snapshot(update), {}
+        if update is update_map_data:
+            # The map data is calculated in the background like the map, the other charts in the worker thread
+            callback, options = background_slot(callback), background_options()
+        app.callback(*outputs,
+                     Input('submit-button-state', 'n_clicks'),
+                     State('category-filter', 'value'),
+                     State('year-slider', 'value'),
+                     **options)(callback)
+
+
+# Measure the serialization and the payload of the callback responses
+install(app.server)
+
+
+@app.server.route('/metrics')
+def prometheus_metrics():
+    """Show the latency and payload metrics of this worker in the Prometheus text format."""
+    return Response(metrics.render(figure_cache.stats() if figure_cache else None),
+                    mimetype='text/plain; version=0.0.4')
+
+
+@app.server.route('/cache-stats')
+def cache_stats():
+    """Show the hit, miss and eviction counters of the figure cache."""
+    return jsonify(figure_cache.stats() if figure_cache else {'mode': 'off'})
+
 
-    if tab == 'comp-acad-collab':
-        return choro_map_comp_acad_collab
-    elif tab == 'comp-acad':
-        return choro_map_comp_acad
-    elif tab == 'comp-collab':
-        return choro_map_comp_collab
-    elif tab == 'collab-acad':
-        return choro_map_collab_acad
-
-
-@app.callback(Output('histogram-year', 'figure'),
-              Output('pie-org', 'figure'),
-              Output('map-data', 'children'),
-              Output('pie-cat-all', 'figure'),
-              Output('pie-cat-academia', 'figure'),
-              Output('pie-cat-companies', 'figure'),
-              Output('pie-cat-collaborations', 'figure'),
-              Input('submit-button-state', 'n_clicks'),
-              State('category-filter', 'value'),
-              State('year-slider', 'value'))
-def create_charts(_n_clicks, filter_categories, year_range):
-    """Calls functions for creating/updating charts and outputs them."""
-    del _n_clicks  # n_clicks is only used for triggering this function
-    dff = filter_dataframe(filter_categories, year_range)
-    return (draw_histogram(dff),
-            draw_pie(dff),
-            calc_country_org_count(dff).to_json(orient='split'),
-            *draw_category_pies(dff))
+@app.server.route('/memory')
+def worker_memory():
+    """Show the memory of this worker, the private part is not shared with the other workers."""
+    return jsonify(private_memory())
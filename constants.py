@@ -1,12 +1,44 @@
 # -*- coding: utf-8 -*-
 """Define constant strings."""
 
-DATASET_PATH = 'dataset/papers.parquet'
+import os
+
+# Data set of the dashboard, for example a synthetic one written by dataset/generate_synthetic.py
+DATASET_PATH = os.environ.get('DATASET_PATH', 'dataset/papers.parquet')
+# Uncompressed Arrow IPC file of the dashboard columns, written by `python loader.py`
+DATASET_IPC_PATH = os.environ.get('DATASET_IPC_PATH', os.path.splitext(DATASET_PATH)[0] + '.arrow')
+# Seconds between the checks for row groups added to the parquet data set, 0 disables the refresh
+DATASET_REFRESH_INTERVAL = float(os.environ.get('DATASET_REFRESH_INTERVAL', 60))
+# Query engine of the data set: 'pandas' (rows and cube in memory), 'arrow' (only reads the row groups
+# of the selected years) or 'duckdb' (SQL over the parquet files), the latter two for data sets larger than the memory
+DATASET_ENGINE = os.environ.get('DATASET_ENGINE', 'pandas')
 PANDASPROFILING_REPORT = 'papers_pandas-profiling-report.html'
 SWEETVIZ_REPORT = 'papers_sweetviz-report.html'
 
 LOADING_TYPE = 'default'
 
+# Filter the histogram and the pie charts in the browser, without a server round trip or the "Update Charts" button
+CLIENTSIDE_FILTERING = os.environ.get('CLIENTSIDE_FILTERING', '0') == '1'
+# Update the charts on the server on every change of the filters, stale requests of a session are dropped
+LIVE_UPDATES = os.environ.get('LIVE_UPDATES', '0') == '1'
+LIVE_UPDATE_DEBOUNCE = float(os.environ.get('LIVE_UPDATE_DEBOUNCE', 0.3))
+# Run the map callbacks in background processes with a job queue on disk, the browser polls for their results
+BACKGROUND_CALLBACKS = os.environ.get('BACKGROUND_CALLBACKS', '0') == '1'
+BACKGROUND_CACHE_DIR = os.environ.get('BACKGROUND_CACHE_DIR', 'cache/background')
+BACKGROUND_POLL_INTERVAL = int(os.environ.get('BACKGROUND_POLL_INTERVAL', 500))
+# Jobs running at once on the host, the jobs of all workers share these slots
+BACKGROUND_MAX_JOBS = int(os.environ.get('BACKGROUND_MAX_JOBS', os.cpu_count() or 1))
+
+# Cache of the rendered figures: 'memory' (per worker), 'disk' (shared by all workers) or 'off'
+FIGURE_CACHE_MODE = os.environ.get('FIGURE_CACHE_MODE', 'memory')
+FIGURE_CACHE_DIR = os.environ.get('FIGURE_CACHE_DIR', 'cache/figures')
+FIGURE_CACHE_MAX_BYTES = int(os.environ.get('FIGURE_CACHE_MAX_BYTES', 64 * 1024 ** 2))
+
+# Store of the map data: 'memory' (per worker) or 'file' (Arrow IPC files shared by all workers)
+RESULT_STORE_MODE = os.environ.get('RESULT_STORE_MODE', 'memory')
+RESULT_STORE_DIR = os.environ.get('RESULT_STORE_DIR', 'cache/results')
+RESULT_STORE_TTL = int(os.environ.get('RESULT_STORE_TTL', 3600))
+
 RESEARCH_CATEGORIES = [
     'ArtsHumanities',
     'LifeSciencesBiomedicine',
@@ -15,6 +47,12 @@ RESEARCH_CATEGORIES = [
     'Technology'
 ]
 
+ORGANISATIONS = [
+    'Academia',
+    'Company',
+    'Collaboration'
+]
+
 # Describe some of the labels
 LABELS = {
     'PY': 'Year Published',
@@ -0,0 +1,58 @@
+"""
+Normalize affiliations and detect the academic ones with compiled patterns
+"""
+# The rules are read from a JSON data file (affiliation_rules.json):
+#   "expansions": abbreviations and their replacements, like "Univ": "University"
+#   "stopwords":  words of academic affiliations, which are matched case-insensitively after the expansion
+# The expansions are one compiled alternation, which replaces all abbreviations in one pass over an affiliation.
+# This equals replacing them one after the other, as long as no replacement contains another abbreviation.
+# Affiliations repeat a lot, so every distinct affiliation is only normalized once.
+# The stopwords are searched in all distinct affiliations at once, with the vectorized string functions of pandas,
+# which run in Arrow for the strings of pandas 3.
+
+import json
+import re
+
+import numpy as np
+import pandas as pd
+
+
+class AffiliationMatcher:
+    """Expand the abbreviations of affiliations and detect the academic ones."""
+
+    def __init__(self, expansions, stopwords):
+        self.expansions = dict(expansions)
+        self.stopwords = list(stopwords)
+        # At the same position, the abbreviation listed first wins
+        self._expansion = re.compile("|".join(re.escape(abbreviation) for abbreviation in self.expansions))
+        self._stopword = re.compile("|".join(re.escape(stopword) for stopword in self.stopwords), re.IGNORECASE)
+
+    @classmethod
+    def from_file(cls, path):
+        """Create the matcher of the rules of a JSON file."""
+        with open(path, encoding="utf-8") as file:
+            rules = json.load(file)
+        return cls(rules["expansions"], rules["stopwords"])
+
+    def expand(self, affiliation):
+        """Replace all abbreviations of an affiliation."""
+        return self._expansion.sub(lambda match: self.expansions[match.group()], affiliation)
+
+    def is_academic(self, affiliation):
+        """Check if an expanded affiliation contains a stopword."""
+        return self._stopword.search(affiliation) is not None
+
+    def normalize(self, affiliations):
+        """Expand the abbreviations of all affiliations and detect the academic ones, missing ones are not academic."""
+        # A string series keeps its dtype, so the Arrow strings of pandas 3 are neither converted to objects nor back,
+        # others (like a column of only missing values) are objects
+        is_string = isinstance(affiliations, pd.Series) and isinstance(affiliations.dtype, pd.StringDtype)
+        codes, distinct = pd.factorize(affiliations if is_string else np.asarray(affiliations, dtype=object))
+        expanded = pd.array([self.expand(affiliation) for affiliation in distinct.tolist()], dtype=distinct.dtype)
+        academic = pd.Series(expanded).str.contains(self._stopword.pattern, case=False).to_numpy(dtype=bool)
+        # The code -1 of missing affiliations selects the appended last element, or is filled with a missing value
+        academic = np.append(academic, False)[codes]
+        expanded = pd.api.extensions.take(expanded, codes, allow_fill=True)
+        if isinstance(affiliations, pd.Series):
+            return pd.Series(expanded, index=affiliations.index, name=affiliations.name), academic
+        return np.asarray(expanded, dtype=object), academic
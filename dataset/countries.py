@@ -0,0 +1,86 @@
+"""
+Resolve the country names of the affiliations to ISO 3166-1 alpha-3 codes
+"""
+# The rules are read from a JSON data file (country_rules.json):
+#   "aliases": names of the dump and the country names they stand for, null for names which are no country
+#   "codes":   countries with a manually set code, like the historic ones which are missing in pycountry
+# Other names are looked up in the names of pycountry, the slow fuzzy search is only the fallback.
+# The looked up codes are kept in a JSON memo file (country_codes.json), so a re-run does not search again.
+# Names without a code are listed in the memo file with null and reported.
+
+import json
+import os
+
+
+class CountryResolver:
+    """Map the country names of the dump to their canonical names and codes."""
+
+    def __init__(self, aliases, codes, cache_path=None):
+        self.aliases = dict(aliases)
+        self.codes = dict(codes)
+        self.cache_path = cache_path
+        self.memo = {}
+        if cache_path is not None and os.path.exists(cache_path):
+            with open(cache_path, encoding="utf-8") as file:
+                self.memo = json.load(file)
+        # Names of this run without a code
+        self.unresolved = set()
+        self._exact_codes = None
+        self._changed = False
+
+    @classmethod
+    def from_file(cls, path, cache_path=None):
+        """Create the resolver of the rules of a JSON file, with a memo file of the looked up codes."""
+        with open(path, encoding="utf-8") as file:
+            rules = json.load(file)
+        return cls(rules["aliases"], rules["codes"], cache_path)
+
+    def canonical_name(self, name):
+        """Replace a name by the country it stands for, None if it is no country."""
+        return self.aliases.get(name, name)
+
+    def exact_codes(self):
+        """Map the lower case names, official names and common names of pycountry to their codes."""
+        if self._exact_codes is None:
+            # Only imported if a name is not in the memo file
+            import pycountry
+            self._exact_codes = {}
+            for country in pycountry.countries:
+                for attribute in ("name", "official_name", "common_name"):
+                    name = getattr(country, attribute, None)
+                    if name is not None:
+                        self._exact_codes.setdefault(name.lower(), country.alpha_3)
+        return self._exact_codes
+
+    def search(self, name):
+        """Look up the code of a name, by its exact name and else by the fuzzy search of pycountry."""
+        code = self.exact_codes().get(name.lower())
+        if code is None:
+            import pycountry
+            try:
+                code = pycountry.countries.search_fuzzy(name)[0].alpha_3
+            except LookupError:
+                code = None
+        return code
+
+    def code(self, name):
+        """Resolve the code of a canonical country name, None if it has none."""
+        if name in self.codes:
+            return self.codes[name]
+        if name not in self.memo:
+            self.memo[name] = self.search(name)
+            self._changed = True
+        if self.memo[name] is None:
+            self.unresolved.add(name)
+        return self.memo[name]
+
+    def save(self):
+        """Write the memo file, if codes were looked up."""
+        if self.cache_path is None or not self._changed:
+            return
+        # A new file is swapped in, so an interrupted run does not leave a broken memo file
+        temporary_path = self.cache_path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(self.memo, file, indent=2, sort_keys=True, ensure_ascii=False)
+        os.replace(temporary_path, self.cache_path)
+        self._changed = False
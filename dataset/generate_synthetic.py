@@ -0,0 +1,187 @@
+"""
+Generate synthetic data sets with the schema of papers.parquet for scale testing
+"""
+# Write 10 million rows, in row groups of one million rows:
+#   python dataset/generate_synthetic.py dataset/synthetic_10m.parquet --rows 10000000
+# Start the dashboard with it:
+#   DATASET_PATH=dataset/synthetic_10m.parquet python index.py
+# With --reference dataset/papers.parquet the years, organisations and countries
+# are sampled from the distributions of the real data set.
+
+import argparse
+import itertools
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Research categories in the order of the dashboard with their share of the publications
+CATEGORIES = {
+    "ArtsHumanities": 0.01,
+    "LifeSciencesBiomedicine": 0.25,
+    "PhysicalSciences": 0.22,
+    "SocialSciences": 0.07,
+    "Technology": 0.80
+}
+CATEGORY_AREAS = {
+    "ArtsHumanities": "Arts & Humanities - Other Topics",
+    "LifeSciencesBiomedicine": "Mathematical & Computational Biology",
+    "PhysicalSciences": "Physics",
+    "SocialSciences": "Business & Economics",
+    "Technology": "Engineering"
+}
+# Category codes as written by pandas: sorted alphabetically
+ORGANISATIONS = ["Academia", "Collaboration", "Company"]
+YEARS = np.arange(1990, 2019)
+
+# Country, country code, region and share of the publications, the rest is spread over the long tail
+COUNTRIES = [
+    ("China", "CHN", "East Asia", 0.24), ("USA", "USA", "North America", 0.20),
+    ("England", "GBR", "Western Europe", 0.04), ("Germany", "DEU", "Western Europe", 0.04),
+    ("Japan", "JPN", "East Asia", 0.035), ("South Korea", "KOR", "East Asia", 0.035),
+    ("India", "IND", "South Asia", 0.035), ("Canada", "CAN", "North America", 0.03),
+    ("France", "FRA", "Western Europe", 0.03), ("Italy", "ITA", "Western Europe", 0.025),
+    ("Spain", "ESP", "Western Europe", 0.02), ("Australia", "AUS", "SouthEast Asia and Pacific", 0.02),
+    ("Taiwan", "TWN", "East Asia", 0.015), ("Iran, Islamic Republic of", "IRN", "MiddleEast and North Africa", 0.015),
+    ("Netherlands", "NLD", "Western Europe", 0.012), ("Switzerland", "CHE", "Western Europe", 0.012),
+    ("Brazil", "BRA", "Latin America and Caribbean", 0.01), ("Singapore", "SGP", "SouthEast Asia and Pacific", 0.01),
+    ("Turkey", "TUR", "Eastern Europe to Central Asia", 0.008), ("Russia", "RUS", "Eastern Europe to Central Asia", 0.008),
+    ("Poland", "POL", "Eastern Europe to Central Asia", 0.006), ("Sweden", "SWE", "Western Europe", 0.006),
+    ("Saudi Arabia", "SAU", "MiddleEast and North Africa", 0.006), ("Israel", "ISR", "MiddleEast and North Africa", 0.005),
+    ("Mexico", "MEX", "Latin America and Caribbean", 0.004), ("Egypt", "EGY", "MiddleEast and North Africa", 0.004),
+    ("South Africa", "ZAF", "Sub-Saharan Africa", 0.003), ("Nigeria", "NGA", "Sub-Saharan Africa", 0.001),
+    ("Viet Nam", "VNM", "SouthEast Asia and Pacific", 0.003), ("Pakistan", "PAK", "South Asia", 0.004),
+]
+
+
+def builtin_profile():
+    """Describe the distributions of the real data set with built-in estimates."""
+    # Publications grow exponentially until 2018
+    year_weights = np.exp(0.22 * (YEARS - YEARS[0]))
+    # Collaborations become more common over time, companies stay at about four percent
+    collaboration = 0.30 + 0.25 * (YEARS - YEARS[0]) / (YEARS[-1] - YEARS[0])
+    company = np.full(len(YEARS), 0.04)
+    org_by_year = np.column_stack([1 - collaboration - company, collaboration, company])
+    countries = pd.DataFrame(COUNTRIES, columns=["Country", "CountryCode", "Region", "Weight"])
+    # Spread the remaining share over a long tail of small countries
+    tail = 1 - countries["Weight"].sum()
+    tail_countries = pd.DataFrame({
+        "Country": [f"Country {i}" for i in range(120)],
+        "CountryCode": [f"X{i:02d}" if i < 100 else f"Y{i - 100:02d}" for i in range(120)],
+        "Region": [countries["Region"].unique()[i % countries["Region"].nunique()] for i in range(120)],
+        "Weight": tail * np.geomspace(1, 0.01, 120) / np.geomspace(1, 0.01, 120).sum()
+    })
+    countries = pd.concat([countries, tail_countries], ignore_index=True)
+    return {
+        "years": YEARS,
+        "year_weights": year_weights / year_weights.sum(),
+        "org_by_year": org_by_year,
+        "countries": countries
+    }
+
+
+def reference_profile(path):
+    """Describe the distributions of years, organisations and countries of a real data set."""
+    frame = pd.read_parquet(path, columns=["PY", "Organisation", "Country", "CountryCode", "Region"])
+    year_counts = frame["PY"].value_counts().sort_index()
+    org_by_year = pd.crosstab(frame["PY"], frame["Organisation"].astype(str), normalize="index")
+    countries = frame.groupby(["Country", "CountryCode", "Region"], observed=True).size()
+    countries = countries.rename("Weight").reset_index().astype({"Country": str, "CountryCode": str, "Region": str})
+    return {
+        "years": year_counts.index.to_numpy(),
+        "year_weights": (year_counts / year_counts.sum()).to_numpy(),
+        "org_by_year": org_by_year.reindex(columns=ORGANISATIONS, fill_value=0).to_numpy(),
+        "countries": countries.assign(Weight=countries["Weight"] / countries["Weight"].sum())
+    }
+
+
+def research_area_names():
+    """Name the research areas (SC) of every combination of categories, computer science and health."""
+    names = []
+    for combination in itertools.product([False, True], repeat=len(CATEGORIES) + 2):
+        # The product varies the last element fastest, so reverse it to match the bitmask codes
+        *active, computer_science, health = combination[::-1]
+        areas = [area for area, is_active in zip(CATEGORY_AREAS.values(), active) if is_active]
+        if computer_science:
+            areas.append("Computer Science")
+        if health:
+            areas.append("Health Care Sciences & Services")
+        names.append("; ".join(areas))
+    return np.array(names, dtype=object)
+
+
+def generate_chunk(rng, profile, size):
+    """Generate a chunk of rows with the schema and the correlations of the real data set."""
+    years = rng.choice(profile["years"], size=size, p=profile["year_weights"])
+    # Sample the organisation from its distribution in the year of publication
+    cdf = profile["org_by_year"].cumsum(axis=1)[np.searchsorted(profile["years"], years)]
+    organisations = np.minimum((rng.random(size)[:, None] > cdf).sum(axis=1), len(ORGANISATIONS) - 1)
+    countries = profile["countries"]
+    country_rows = rng.choice(len(countries), size=size, p=countries["Weight"].to_numpy())
+
+    # Every publication has at least one research category, Technology is the most common
+    active = rng.random((size, len(CATEGORIES))) < np.array(list(CATEGORIES.values()))
+    active[~active.any(axis=1), list(CATEGORIES).index("Technology")] = True
+    shares = active / active.sum(axis=1, keepdims=True)
+    computer_science = active[:, list(CATEGORIES).index("Technology")] & (rng.random(size) < 0.7)
+    health = active[:, list(CATEGORIES).index("LifeSciencesBiomedicine")] & (rng.random(size) < 0.5)
+    area_codes = (active * (1 << np.arange(len(CATEGORIES)))).sum(axis=1)
+    area_codes += (computer_science.astype(int) << len(CATEGORIES)) + (health.astype(int) << (len(CATEGORIES) + 1))
+
+    # Collaborations have more authors, recent publications fewer citations per year
+    is_collaboration = organisations == ORGANISATIONS.index("Collaboration")
+    num_authors = 1 + rng.poisson(2 + 2 * is_collaboration)
+    cited_references = rng.negative_binomial(2, 2 / 37, size=size)
+    times_cited = rng.lognormal(0.5, 1.2, size=size) * np.exp(-0.05 * (years - profile["years"][0]))
+
+    country_values = {
+        column: pd.Categorical.from_codes(
+            pd.Categorical(countries[column], categories=countries[column].unique()).codes[country_rows],
+            categories=countries[column].unique()
+        )
+        for column in ["Region", "Country", "CountryCode"]
+    }
+    frame = pd.DataFrame({
+        "PY": years.astype(np.uint16),
+        "SC": pd.Categorical(research_area_names()[area_codes]),
+        **{category: shares[:, i] for i, category in enumerate(CATEGORIES)},
+        "ComputerScience": computer_science.astype(np.uint8),
+        "Health": health.astype(np.uint8),
+        "NR": np.minimum(cited_references, np.iinfo(np.uint16).max).astype(np.uint16),
+        "TCperYear": times_cited,
+        "NumAuthors": np.minimum(num_authors, np.iinfo(np.uint16).max).astype(np.uint16),
+        "Organisation": pd.Categorical.from_codes(organisations, categories=ORGANISATIONS),
+        **country_values
+    })
+    return frame
+
+
+def write_dataset(path, rows, chunk_size, profile, seed):
+    """Write the data set chunk by chunk as parquet row groups, so its size is not limited by the memory."""
+    writer = None
+    for index, start in enumerate(range(0, rows, chunk_size)):
+        # Seeding every chunk separately keeps the output independent of the chunk order
+        rng = np.random.default_rng([seed, index])
+        table = pa.Table.from_pandas(generate_chunk(rng, profile, min(chunk_size, rows - start)), preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(path, table.schema)
+        else:
+            # The research area categories differ per chunk, the column types do not
+            table = table.cast(writer.schema)
+        writer.write_table(table)
+        print(f"Wrote {start + table.num_rows} of {rows} rows")
+    if writer is not None:
+        writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", help="path of the parquet file to write")
+    parser.add_argument("--rows", type=int, default=287544, help="number of rows")
+    parser.add_argument("--chunk-size", type=int, default=1000000, help="rows per chunk and row group")
+    parser.add_argument("--reference", help="real data set to take the distributions from")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random generator")
+    args = parser.parse_args()
+    write_dataset(args.path, args.rows, args.chunk_size,
+                  reference_profile(args.reference) if args.reference else builtin_profile(), args.seed)
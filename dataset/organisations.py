@@ -0,0 +1,109 @@
+"""
+Classify the organisation type of publications by their first two affiliations
+"""
+# A publication is classified by the affiliation C1 of its first author and C2 of its second one.
+# Publications whose C1 contains an academic stopword are academic, the others are from companies.
+# Without C2 a publication belongs to the type of its C1. With C2 it is a Collaboration, unless C2
+# is a substring of the C1 affiliations of all publications of the same type, joined by spaces.
+# The text of the joined affiliations is built once per type and the substring tests run vectorized
+# on an index of its byte runs, instead of joining and scanning the text again for every publication.
+
+import numpy as np
+import pandas as pd
+
+# Length of the byte runs of the substring index, which fit into one uint64
+RUN_LENGTH = 8
+
+
+def run_values(data, length):
+    """Pack every run of consecutive bytes into one integer, equal runs have equal values."""
+    data = np.frombuffer(data, dtype=np.uint8)
+    count = len(data) - length + 1
+    if count <= 0:
+        return np.empty(0, dtype=np.uint64)
+    values = np.zeros(count, dtype=np.uint64)
+    for offset in range(length):
+        values |= data[offset:offset + count].astype(np.uint64) << np.uint64(8 * (length - 1 - offset))
+    return values
+
+
+def is_in_sorted(values, sorted_values):
+    """Test every value for being in a sorted array."""
+    if len(sorted_values) == 0:
+        return np.zeros(len(values), dtype=bool)
+    positions = np.minimum(np.searchsorted(sorted_values, values), len(sorted_values) - 1)
+    return sorted_values[positions] == values
+
+
+class SubstringIndex:
+    """Test strings for being substrings of the text of joined parts, like `string in " ".join(parts)`."""
+
+    def __init__(self, parts):
+        self.parts = set(parts)
+        self.text = " ".join(parts)
+        self._data = self.text.encode("utf-8")
+        self._runs = {}
+
+    def runs(self, length):
+        """List the distinct byte runs of a length in the text, sorted by their values."""
+        if length not in self._runs:
+            self._runs[length] = np.unique(run_values(self._data, length))
+        return self._runs[length]
+
+    def contains(self, strings):
+        """Test every string for being a substring of the text."""
+        # The UTF-8 bytes of a string are in the bytes of the text if and only if the string is in the text
+        encoded = [string.encode("utf-8") for string in strings]
+        lengths = np.array([len(data) for data in encoded], dtype=np.int64)
+        result = lengths == 0
+        # A short string is one run, it is in the text if the text has this run
+        for length in range(1, RUN_LENGTH + 1):
+            rows = np.flatnonzero(lengths == length)
+            if len(rows):
+                values = run_values(b"".join(encoded[row] for row in rows), length)[::length]
+                result[rows] = is_in_sorted(values, self.runs(length))
+        # A long string can only be in the text, if all of its runs are
+        rows = np.flatnonzero(lengths > RUN_LENGTH)
+        if len(rows):
+            found = is_in_sorted(run_values(b"".join(encoded[row] for row in rows), RUN_LENGTH), self.runs(RUN_LENGTH))
+            # Count the missing runs of every string, runs spanning two strings are not counted
+            missing = np.concatenate([[0], np.cumsum(~found)])
+            starts = np.concatenate([[0], np.cumsum(lengths[rows])[:-1]])
+            stops = starts + lengths[rows] - RUN_LENGTH + 1
+            for row in rows[missing[stops] == missing[starts]]:
+                # The runs may be in the text at unrelated positions, so the few candidates are verified
+                result[row] = strings[row] in self.parts or strings[row] in self.text
+        return result
+
+
+def organisation_indexes(c1, academic):
+    """Build the substring index of the C1 affiliations of the companies and of academia."""
+    c1 = np.asarray(c1, dtype=object)
+    academic = np.asarray(academic, dtype=bool)
+    # The parts are joined in the order of their first appearance
+    return {is_academic: SubstringIndex(pd.unique(c1[academic == is_academic])) for is_academic in (False, True)}
+
+
+def classify_with_indexes(indexes, c2, academic):
+    """Classify every publication by the type of its C1 and by its C2, using prebuilt substring indexes."""
+    c2 = np.asarray(c2, dtype=object)
+    academic = np.asarray(academic, dtype=bool)
+    organisations = np.empty(len(c2), dtype=object)
+    for is_academic, organisation in [(False, "Company"), (True, "Academia")]:
+        rows = np.flatnonzero(academic == is_academic)
+        if not len(rows):
+            continue
+        second = c2[rows]
+        single = pd.isna(second)
+        # Every distinct C2 is tested once
+        strings = pd.unique(second[~single])
+        contained = dict(zip(strings, indexes[is_academic].contains(list(strings))))
+        same = single.copy()
+        same[~single] = [contained[string] for string in second[~single]]
+        organisations[rows] = np.where(same, organisation, "Collaboration")
+    return organisations
+
+
+def classify_organisations(c1, c2, academic):
+    """Classify every publication as Company, Academia or Collaboration, by the type of its C1 and by its C2."""
+    return classify_with_indexes(organisation_indexes(c1, academic), c2, academic)
@@ -0,0 +1,267 @@
+"""
+Stream the Web of Science dump in chunks through the processing stages into a parquet file
+"""
+# Run this from the dataset directory, the memory is bounded by the chunk size instead of the dump size:
+#   python pipeline.py DL_PAPER_1990_2018.tsv DL_COUNTRY_REGION.tsv papers.parquet --chunk-size 200000 --workers 32
+# The organisation of a publication depends on the affiliations of all publications, so the dump is read twice:
+# the first pass only reads C1 and AB to collect the distinct affiliations, the second one writes the rows.
+# The stages are the same as in data_processing.py, which runs them on the whole dump in memory.
+# The row-wise stages of the chunks run in a pool of worker processes, which get the lookups once when they start.
+# The deduplication and the writing run in this process in the order of the chunks,
+# so the parquet file is the same for any number of workers.
+
+import argparse
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from affiliations import AffiliationMatcher
+from countries import CountryResolver
+from organisations import SubstringIndex, classify_with_indexes, is_in_sorted
+
+# Columns of the dump which are used, with explicit types, so the chunks do not need type inference
+PAPER_DTYPES = {
+    "UT": object,
+    "PY": np.uint16,
+    "SC": object,
+    "ArtsHumanities": np.float64,
+    "LifeSciencesBiomedicine": np.float64,
+    "PhysicalSciences": np.float64,
+    "SocialSciences": np.float64,
+    "Technology": np.float64,
+    "ComputerScience": np.uint8,
+    "Health": np.uint8,
+    "NR": np.uint16,
+    "TCperYear": np.float64,
+    "nb_aut": np.uint16,
+    "C1": object,
+    "AB": object
+}
+# Columns of the publications, which are kept after the classification
+PAPER_COLUMNS = ["UT", "PY", "SC", "ArtsHumanities", "LifeSciencesBiomedicine", "PhysicalSciences", "SocialSciences",
+                 "Technology", "ComputerScience", "Health", "NR", "TCperYear", "nb_aut", "Organisation"]
+CATEGORY_COLUMNS = ["SC", "Organisation", "Region", "Country", "CountryCode"]
+# Aliases and manual codes of the countries, and the memo file of the looked up codes
+COUNTRY_RULES_PATH = "country_rules.json"
+COUNTRY_CACHE_PATH = "country_codes.json"
+# Everything in brackets, like "[name" patterns of author names
+BRACKETS = re.compile(r"[\(\[].*?[\)\]]")
+# Read-only lookups of the stages in a worker process: the matcher, the substring indexes and the country table
+_lookups = {}
+
+
+class SeenHashes:
+    """Set of 64-bit hashes in sorted arrays, which need 8 bytes per entry."""
+
+    def __init__(self):
+        # Levels of decreasing size, merged like a log-structured merge tree
+        self._levels = []
+
+    def __len__(self):
+        return sum(len(level) for level in self._levels)
+
+    def first_seen(self, hashes):
+        """Mark the hashes seen for the first time, the first one of equal hashes within the array."""
+        mask = np.zeros(len(hashes), dtype=bool)
+        mask[np.unique(hashes, return_index=True)[1]] = True
+        for level in self._levels:
+            mask &= ~is_in_sorted(hashes, level)
+        self._levels.append(np.sort(hashes[mask]))
+        # Merge levels of similar size, so there are only logarithmically many of them
+        while len(self._levels) > 1 and len(self._levels[-2]) <= 2 * len(self._levels[-1]):
+            newer = self._levels.pop()
+            self._levels[-1] = np.union1d(self._levels[-1], newer)
+        return mask
+
+
+def drop_seen_abstracts(papers, seen):
+    """Drop the publications without affiliation and the duplicates of earlier abstracts."""
+    papers = papers.dropna(subset=["C1"])
+    # Hash collisions of 64 bits are negligible, missing abstracts are duplicates of each other like in pandas
+    return papers[seen.first_seen(pd.util.hash_array(papers["AB"].to_numpy(dtype=object)))]
+
+
+def split_affiliations(c1):
+    """Remove the bracketed parts and split the name of the first two affiliations from C1."""
+    cleaned = c1.str.replace(BRACKETS, "", regex=True).str.lstrip()
+    # Unlike str.partition, str.split also returns the columns of an empty chunk
+    affiliations = cleaned.str.split(";", n=1)
+    # The name always is before the first comma, a publication with one affiliation has no C2
+    return affiliations.str[0].str.split(",", n=1).str[0], affiliations.str[1].str.split(",", n=1).str[0]
+
+
+def prepare_affiliations(papers, matcher):
+    """Split and normalize the affiliations of a chunk and detect its academic publications."""
+    c1, c2 = split_affiliations(papers["C1"])
+    c1, academic = matcher.normalize(c1)
+    c2, _ = matcher.normalize(c2)
+    return c1, c2, academic
+
+
+def load_country_table(path, rules_path=COUNTRY_RULES_PATH, cache_path=COUNTRY_CACHE_PATH):
+    """Load the countries and regions of the affiliations of every publication, with improved names and codes."""
+    dl_country = pd.read_csv(path, sep="\t")
+    # - Drop unneeded variables
+    dl_country.drop(["aff", "PY"], axis=1, inplace=True)
+    # - Rename some regions
+    dl_country["Region"] = dl_country["Region"].replace({
+        "WesternEurope": "Western Europe",
+        "Eastern Europe Central Asia": "Eastern Europe to Central Asia",
+        "MiddleEast North Africa": "MiddleEast and North Africa",
+        "SouthEast Asia Pacific": "SouthEast Asia and Pacific",
+        "Latin America Caribbean": "Latin America and Caribbean"
+    })
+    # - Rename US states: Country values with only two letters are US states
+    dl_country["C1"] = dl_country["C1"].apply(lambda country: "USA" if len(country) == 2 else country)
+    # - Improve some country names, with the aliases of country_rules.json
+    resolver = CountryResolver.from_file(rules_path, cache_path)
+    dl_country["C1"] = dl_country["C1"].map(resolver.canonical_name)
+    # - Identify the countries: manual codes, then the memo file, then the names of pycountry
+    ct = pd.DataFrame({"Country": dl_country["C1"].value_counts().index})
+    ct["CountryCode"] = ct["Country"].map(resolver.code)
+    resolver.save()
+    if resolver.unresolved:
+        print("Countries without a code:", ", ".join(sorted(resolver.unresolved)))
+    # - Add country code column using the new table
+    return dl_country.merge(ct, how="left", left_on="C1", right_on="Country")
+
+
+def add_countries(papers, dl_country):
+    """Add the country and the region of every affiliation of the publications."""
+    final_df = papers.merge(dl_country, how="inner")
+    # - Drop "UT" features and "Nb_aut_aff"
+    final_df = final_df.drop(["UT", "nb_aut_aff", "C1"], axis="columns")
+    # - Rename features
+    return final_df.rename({"nb_aut": "NumAuthors"}, axis="columns")
+
+
+def output_schema(table):
+    """Widen the dictionary indices of the first chunk, so the categories of all chunks fit."""
+    return pa.schema([field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+                      if pa.types.is_dictionary(field.type) else field
+                      for field in table.schema], metadata=table.schema.metadata)
+
+
+def read_chunks(path, chunk_size, columns):
+    """Read the dump chunk by chunk with the explicit column types."""
+    return pd.read_csv(path, sep="\t", usecols=columns, dtype={column: PAPER_DTYPES[column] for column in columns},
+                       chunksize=chunk_size)
+
+
+def init_worker(lookups):
+    """Keep the read-only lookups of the stages, they are sent once to every worker process."""
+    _lookups.clear()
+    _lookups.update(lookups)
+
+
+def ordered_map(function, items, workers, lookups):
+    """Run a stage on every item in a pool of worker processes, the results are yielded in the order of the items."""
+    if workers <= 1:
+        init_worker(lookups)
+        yield from map(function, items)
+        return
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(lookups,)) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(function, item))
+            # Only a few chunks per worker are in memory at a time
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def chunk_affiliations(papers):
+    """Stage of the first pass: the distinct C1 affiliations of the companies and of academia of a chunk."""
+    c1, _, academic = prepare_affiliations(papers, _lookups["matcher"])
+    c1 = c1.to_numpy(dtype=object)
+    return {is_academic: pd.unique(c1[academic == is_academic]) for is_academic in (False, True)}
+
+
+def classify_chunk(papers):
+    """Stage of the second pass: classify the publications of a chunk and add their countries."""
+    _, c2, academic = prepare_affiliations(papers, _lookups["matcher"])
+    papers = papers.assign(Organisation=classify_with_indexes(_lookups["indexes"], c2, academic))[PAPER_COLUMNS]
+    return add_countries(papers, _lookups["dl_country"])
+
+
+def finish_chunk(final_df, seen_rows):
+    """Drop the rows written before and convert the chunk to the types of the parquet file."""
+    # - Drop duplicates, which may be in different chunks
+    final_df = final_df[seen_rows.first_seen(pd.util.hash_pandas_object(final_df, index=False).to_numpy())]
+    # - Sort by year, so the chunk is written as one row group per year
+    final_df = final_df.sort_values("PY", kind="stable", ignore_index=True)
+    return final_df.astype({column: "category" for column in CATEGORY_COLUMNS})
+
+
+def year_slices(years):
+    """Yield the start and the length of the rows of every year in the sorted years."""
+    starts = np.searchsorted(years, pd.unique(years))
+    for start, stop in zip(starts, np.append(starts[1:], len(years))):
+        yield start, stop - start
+
+
+def unique_chunks(papers_path, chunk_size, columns):
+    """Read the chunks without the publications without affiliation and the duplicates of earlier abstracts."""
+    seen = SeenHashes()
+    for chunk in read_chunks(papers_path, chunk_size, columns):
+        chunk = drop_seen_abstracts(chunk, seen)
+        # A chunk may be empty, if all of its publications lack C1 or repeat earlier abstracts
+        if len(chunk):
+            yield chunk
+
+
+def collect_affiliations(papers_path, chunk_size, matcher, workers=1):
+    """First pass: collect the distinct C1 affiliations of the companies and of academia in order of appearance."""
+    affiliations = {False: {}, True: {}}
+    chunks = unique_chunks(papers_path, chunk_size, ["C1", "AB"])
+    # The chunks are merged in their order, so the indexes do not depend on the number of workers
+    for distinct in ordered_map(chunk_affiliations, chunks, workers, {"matcher": matcher}):
+        for is_academic, parts in distinct.items():
+            affiliations[is_academic].update(dict.fromkeys(parts))
+    return {is_academic: SubstringIndex(list(parts)) for is_academic, parts in affiliations.items()}
+
+
+def run_pipeline(papers_path, countries_path, output_path, chunk_size, rules_path, workers=1):
+    """Process the dump chunk by chunk and write every year of a chunk as a parquet row group."""
+    matcher = AffiliationMatcher.from_file(rules_path)
+    indexes = collect_affiliations(papers_path, chunk_size, matcher, workers)
+    lookups = {"matcher": matcher, "indexes": indexes, "dl_country": load_country_table(countries_path)}
+    seen_rows = SeenHashes()
+    writer = None
+    rows = 0
+    chunks = unique_chunks(papers_path, chunk_size, list(PAPER_DTYPES))
+    # The deduplication and the writing stay in this process, in the order of the chunks
+    for final_df in ordered_map(classify_chunk, chunks, workers, lookups):
+        final_df = finish_chunk(final_df, seen_rows)
+        # No empty row groups, the types of the first row group are the types of the file
+        if final_df.empty:
+            continue
+        table = pa.Table.from_pandas(final_df, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(output_path, output_schema(table), compression="gzip", write_statistics=True)
+        table = table.cast(writer.schema)
+        # Every row group has one year, so its min/max statistics let readers skip the years outside of a filter
+        for start, length in year_slices(final_df["PY"].to_numpy()):
+            writer.write_table(table.slice(start, length))
+        rows += len(final_df)
+        print(f"Wrote {rows} rows")
+    if writer is not None:
+        writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("papers", nargs="?", default="DL_PAPER_1990_2018.tsv", help="dump of the publications")
+    parser.add_argument("countries", nargs="?", default="DL_COUNTRY_REGION.tsv", help="countries of the affiliations")
+    parser.add_argument("output", nargs="?", default="papers.parquet", help="path of the parquet file to write")
+    parser.add_argument("--chunk-size", type=int, default=200000, help="rows per chunk")
+    parser.add_argument("--rules", default="affiliation_rules.json", help="abbreviations and academic stopwords")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes of the chunk stages")
+    args = parser.parse_args()
+    run_pipeline(args.papers, args.countries, args.output, args.chunk_size, args.rules, args.workers)
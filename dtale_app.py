@@ -5,26 +5,46 @@
 # Run this app with `python dtale_app.py` and
 # visit http://localhost:8050/ in your web browser.
 
+import threading
+
 import pandas as pd
 from flask import redirect, request
 from dtale.app import build_app
 from dtale.views import startup
-from dtale.global_state import cleanup
 import dtale
 
-DATASET_PATH = 'dataset/papers.parquet'
+from aggregates import concat_frames
+from constants import DATASET_PATH
+from loader import read_row_groups, row_groups
+
 DATASET_NAME = 'papers'
 
 # Dtale application
 app = build_app(reaper_on=False)
 
+# The loaded data set and its row groups, a reload only reads the row groups added since
+loaded = {'frame': None, 'parts': []}
+loaded_lock = threading.Lock()
+
 
 @app.route('/reload')
 def load_dataset():
-    """Load data set and start a dtale instance."""
-    df = pd.read_parquet(DATASET_PATH)
-    cleanup(DATASET_NAME)
-    startup(data_id=DATASET_NAME, data=df, ignore_duplicate=True)
+    """Load the new rows of the data set and replace the data of the dtale instance."""
+    with loaded_lock:
+        parts = row_groups(DATASET_PATH)
+        known = set(loaded['parts'])
+        if loaded['frame'] is not None and known.issubset(parts):
+            new_parts = [part for part in parts if part not in known]
+            frame = concat_frames([loaded['frame'], read_row_groups(new_parts)]) if new_parts else loaded['frame']
+        else:
+            # Nothing is loaded yet or row groups were changed, which can not be applied as a delta
+            new_parts = parts
+            frame = pd.read_parquet(DATASET_PATH)
+        # An unchanged data set is only passed again, if its instance was removed in the meantime
+        if new_parts or dtale.get_instance(DATASET_NAME) is None:
+            # Replacing the data keeps the instance and its URL, so open views do not break
+            startup(data_id=DATASET_NAME, data=frame, ignore_duplicate=True)
+        loaded.update(frame=frame, parts=parts)
     # Redirect to the data set which was loaded
     return redirect(f'{request.script_root}/dtale/main/{DATASET_NAME}', code=302)
 
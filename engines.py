@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""Define the query engines, which filter and aggregate the data set for the charts."""
+
+# Every engine is a snapshot of the data set with the same interface:
+# query() returns the cells of the aggregate cube matching a filter, select() the matching rows,
+# refreshed() the engine of the changed parquet data. The charts are drawn from the cells,
+# so they do not depend on the engine.
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from aggregates import (CATEGORY_BITS, CUBE_KEYS, build_country_names, build_cube, concat_frames, index_frame,
+                        merge_cubes, query_cube, select_rows, selection_bitmask)
+from loader import DASHBOARD_COLUMNS, load_dataset, read_row_groups, scan_years, year_range_of
+
+
+def dataset_version(parts):
+    """Derive the version of the data set from its row groups, equal data sets have equal versions."""
+    digest = hashlib.sha1()
+    for _, _, checksum in parts:
+        digest.update(checksum.encode())
+    return digest.hexdigest()[:12]
+
+
+class PandasEngine:
+    """Keep the rows and the aggregate cube in memory, the queries only filter the cube."""
+
+    def __init__(self, frame, parts, cube=None):
+        self.frame = frame
+        self.parts = parts
+        self.version = dataset_version(parts)
+        # Precompute the aggregate cube which is queried by the charts
+        self.cube = build_cube(frame) if cube is None else cube
+        # Lookup table of the country names
+        self.country_names = build_country_names(frame)
+        # Publication year range
+        self.years = (int(frame['PY'].min()), int(frame['PY'].max()))
+
+    @classmethod
+    def load(cls, parquet_path, ipc_path, parts):
+        """Load the dashboard columns, from the Arrow IPC file if it is up to date."""
+        return cls(load_dataset(parquet_path, ipc_path), parts)
+
+    def refreshed(self, parquet_path, parts):
+        """Add the rows of the new row groups, or reload all rows if row groups were changed or removed."""
+        known = set(self.parts)
+        if not known.issubset(parts):
+            return PandasEngine(index_frame(pd.read_parquet(parquet_path, columns=DASHBOARD_COLUMNS)), parts)
+        new_parts = [part for part in parts if part not in known]
+        if not new_parts:
+            # Only the modification time changed
+            return self
+        # Only the new rows are read, the cube of the old rows is kept and the new counts are added
+        delta = index_frame(read_row_groups(new_parts, DASHBOARD_COLUMNS))
+        return PandasEngine(index_frame(concat_frames([self.frame, delta])), parts,
+                            merge_cubes([self.cube, build_cube(delta)]))
+
+    def query(self, filter_categories, year_range):
+        """Select the cells of the cube matching the filter."""
+        return query_cube(self.cube, filter_categories, year_range)
+
+    def select(self, filter_categories, year_range):
+        """Select the rows matching the filter."""
+        return select_rows(self.frame, filter_categories, year_range)
+
+
+class ArrowEngine:
+    """Keep no rows in memory and only read the row groups of the selected years on demand."""
+
+    def __init__(self, path, parts, max_ranges=8):
+        self.path = path
+        self.parts = parts
+        self.version = dataset_version(parts)
+        # Neither the rows nor the cube of all years are kept in memory
+        self.frame = None
+        self.cube = None
+        self.years = year_range_of(path)
+        # The country names of all year ranges read so far
+        self.country_names = pd.Series(dtype=object)
+        self.max_ranges = max_ranges
+        self._cubes = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, parquet_path, ipc_path, parts):
+        """Only read the statistics of the row groups, the rows are read by the queries."""
+        return cls(parquet_path, parts)
+
+    def refreshed(self, parquet_path, parts):
+        """Read the changed row groups on demand, nothing of the old data set is kept."""
+        return ArrowEngine(parquet_path, parts, self.max_ranges)
+
+    def range_cube(self, year_range):
+        """Build the cube of the rows of a year range, the cubes of recently selected ranges are kept."""
+        start, stop = int(year_range[0]), int(year_range[1])
+        with self._lock:
+            # The cube of a wider range also answers the queries of a narrower one
+            for key, cube in self._cubes.items():
+                if key[0] <= start and stop <= key[1]:
+                    self._cubes.move_to_end(key)
+                    return cube
+        cubes = []
+        names = self.country_names
+        # Only one batch of rows is in memory at a time
+        for frame in scan_years(self.path, (start, stop), DASHBOARD_COLUMNS):
+            frame = index_frame(frame)
+            cubes.append(build_cube(frame))
+            names = names.combine_first(build_country_names(frame))
+        cube = merge_cubes(cubes)
+        with self._lock:
+            self._cubes[start, stop] = cube
+            while len(self._cubes) > self.max_ranges:
+                self._cubes.popitem(last=False)
+            self.country_names = names
+        return cube
+
+    def query(self, filter_categories, year_range):
+        """Select the cells matching the filter from the cube of the year range."""
+        return query_cube(self.range_cube(year_range), filter_categories, year_range)
+
+    def select(self, filter_categories, year_range):
+        """Select the rows matching the filter, batch by batch."""
+        return concat_frames([select_rows(index_frame(frame), filter_categories, year_range)
+                              for frame in scan_years(self.path, year_range, DASHBOARD_COLUMNS)])
+
+
+class DuckDBEngine:
+    """Run the aggregations as SQL over the parquet files, on all cores and without keeping the rows in memory."""
+
+    def __init__(self, path, parts):
+        # Optional dependency of this engine: pip install duckdb
+        import duckdb
+        self._duckdb = duckdb
+        self.path = path
+        self.parts = parts
+        self.version = dataset_version(parts)
+        self.frame = None
+        self.cube = None
+        source = os.path.join(path, '**', '*.parquet') if os.path.isdir(path) else path
+        self._source = "read_parquet('{}', hive_partitioning = true)".format(source.replace("'", "''"))
+        # The category bitmask of every row, like aggregates.category_bitmask (NaN and NULL count as set)
+        self._mask = ' | '.join(f'(CASE WHEN coalesce("{category}" <> 0, true) THEN {bit} ELSE 0 END)'
+                                for category, bit in CATEGORY_BITS.items())
+        self._connection = None
+        self._pid = None
+        years = self._execute(f'SELECT min(PY), max(PY) FROM {self._source}').fetchone()
+        self.years = (int(years[0]), int(years[1]))
+        names = self._execute(f'SELECT CountryCode, first(Country) AS Country FROM {self._source} '
+                              'WHERE CountryCode IS NOT NULL GROUP BY CountryCode').df()
+        self.country_names = pd.Series(names['Country'].to_numpy(), index=names['CountryCode'].to_numpy())
+
+    @classmethod
+    def load(cls, parquet_path, ipc_path, parts):
+        """Only read the year range and the country names, the rows are read by the queries."""
+        return cls(parquet_path, parts)
+
+    def refreshed(self, parquet_path, parts):
+        """Query the changed parquet files, nothing of the old data set is kept."""
+        return DuckDBEngine(parquet_path, parts)
+
+    def _execute(self, sql, parameters=None):
+        """Run a query on a cursor of the connection of this process, connections must not cross a fork."""
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = self._duckdb.connect()
+            self._pid = os.getpid()
+        # Every cursor is a connection of its own, so the queries of parallel requests do not interfere
+        return self._connection.cursor().execute(sql, parameters or [])
+
+    def query(self, filter_categories, year_range):
+        """Count the rows matching the filter by the cube keys."""
+        keys = ', '.join(CUBE_KEYS)
+        return self._execute(
+            f'SELECT {keys}, count(*) AS Count '
+            f'FROM (SELECT {self._mask} AS CategoryMask, PY, Organisation, CountryCode FROM {self._source} '
+            '      WHERE PY BETWEEN ? AND ?) '
+            f'WHERE (CategoryMask & ?) <> 0 GROUP BY {keys}',
+            [int(year_range[0]), int(year_range[1]), selection_bitmask(filter_categories)]
+        ).df()
+
+    def select(self, filter_categories, year_range):
+        """Select the rows matching the filter, sorted by year."""
+        columns = ', '.join(f'"{column}"' for column in DASHBOARD_COLUMNS)
+        return self._execute(
+            f'SELECT * FROM (SELECT {columns}, {self._mask} AS CategoryMask FROM {self._source} '
+            '               WHERE PY BETWEEN ? AND ?) '
+            'WHERE (CategoryMask & ?) <> 0 ORDER BY PY',
+            [int(year_range[0]), int(year_range[1]), selection_bitmask(filter_categories)]
+        ).df()
+
+
+ENGINES = {
+    'pandas': PandasEngine,
+    'arrow': ArrowEngine,
+    'duckdb': DuckDBEngine
+}
+
+
+def make_engine(name, parquet_path, ipc_path, parts):
+    """Create the query engine of the configured name."""
+    if name not in ENGINES:
+        raise ValueError(f"Unknown engine '{name}', use 'pandas', 'arrow' or 'duckdb'")
+    return ENGINES[name].load(parquet_path, ipc_path, parts)
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""Define the figure templates of the charts, which are built once at startup."""
+
+from dash import Patch
+import plotly.express as px
+import plotly.graph_objects as go
+
+from constants import COLOR_MAP, LABELS, ORGANISATIONS, RESEARCH_CATEGORIES
+
+# Set alternative color scheme
+color_list = px.colors.qualitative.Antique
+# Move grey to fifth position
+color_list.insert(4, color_list.pop(10))
+
+# Settings of the choropleth map tabs
+MAP_TABS = {
+    'comp-acad-collab': {
+        'column': 'CompanyAcademiaCollabFraction',
+        'colors': ('Academia', 'Company'),
+        'range': [30, 50],
+        'title': 'Company to Academia Publication Fractions (Collab. count for both)',
+        'colorbar': 'Company Fraction'
+    },
+    'comp-acad': {
+        'column': 'CompanyAcademiaFraction',
+        'colors': ('Academia', 'Company'),
+        'range': [0, 20],
+        'title': 'Company to Academia Publication Fractions',
+        'colorbar': 'Company Fraction'
+    },
+    'comp-collab': {
+        'column': 'CompanyCollaborationFraction',
+        'colors': ('Collaboration', 'Company'),
+        'range': [0, 16],
+        'title': 'Company to Collaboration Publication Fractions',
+        'colorbar': 'Company Fraction'
+    },
+    'collab-acad': {
+        'column': 'CollaborationAcademiaFraction',
+        'colors': ('Academia', 'Collaboration'),
+        'range': [40, 100],
+        'title': 'Collaboration to Academia Publication Fractions',
+        'colorbar': 'Collabor. Fraction'
+    }
+}
+
+
+def map_hover_template(column):
+    """Describe the hover label of a map like plotly express does."""
+    return ('<b>%{hovertext}</b><br><br>'
+            f'{LABELS["CountryCode"]}=%{{location}}<br>'
+            'Academia=%{customdata[0]}<br>'
+            'Company=%{customdata[1]}<br>'
+            'Collaboration=%{customdata[2]}<br>'
+            f'{column}=%{{z}}<extra></extra>')
+
+
+def fill_figure(template, traces):
+    """Fill the data arrays of every trace into a template and return a plain dict figure."""
+    return {
+        'data': [{**trace, **values} for trace, values in zip(template['data'], traces)],
+        'layout': template['layout']
+    }
+
+
+def patch_figure(figure, template):
+    """Turn a filled figure into a partial update of only the parts which differ from its template."""
+    patch = Patch()
+    for i, (trace, template_trace) in enumerate(zip(figure['data'], template['data'])):
+        for key, value in trace.items():
+            if value is not template_trace.get(key):
+                patch['data'][i][key] = value
+    for key, value in figure['layout'].items():
+        if value is not template['layout'].get(key):
+            patch['layout'][key] = value
+    return patch
+
+
+# --- TEMPLATES ---
+
+# Base of the choropleth maps, which is shared by all tabs
+base_map = go.Figure(
+    go.Choropleth(coloraxis='coloraxis')
+).update_layout(
+    title_x=0.5,
+    height=800,
+    margin={'t': 60},
+    coloraxis_colorbar=dict(
+        ticks='outside',
+        ticksuffix='%'
+    )
+).update_geos(
+    center={'lat': 20},
+    visible=False,
+    showland=True,
+    landcolor='#ccc',
+    showcoastlines=True,
+    projection_type='natural earth'
+).to_dict()
+
+# Histogram with one bar trace per organisation
+histogram_template = go.Figure([
+        go.Bar(
+            name=organisation,
+            legendgroup=organisation,
+            offsetgroup=organisation,
+            marker_color=COLOR_MAP[organisation],
+            hovertemplate=f'Organisation={organisation}<br>{LABELS["PY"]}=%{{x}}<br>Count=%{{y}}<extra></extra>'
+        )
+        for organisation in ORGANISATIONS
+    ]
+).update_layout(
+    barmode='group',
+    title_text='Publications of Organisations by Year',
+    title_x=0.5,
+    xaxis_title_text=LABELS['PY'],
+    yaxis_title_text='Count',
+    legend_title_text='Organisation',
+    legend_tracegroupgap=0,
+    margin={'t': 60}
+).to_dict()
+
+# Pie chart of the organisations, the labels are fixed and only the values are filled in
+pie_template = go.Figure(
+    go.Pie(
+        labels=ORGANISATIONS,
+        marker_colors=[COLOR_MAP[organisation] for organisation in ORGANISATIONS],
+        hovertemplate='Organisation=%{label}<br>Count=%{value}<extra></extra>'
+    )
+).update_layout(
+    title_text='Distribution of Publications',
+    title_x=0.5,
+    legend_tracegroupgap=0,
+    margin={'t': 60}
+).to_dict()
+
+
+def category_pie_template(value_name, title, showlegend):
+    """Build the template of a pie chart of the research categories."""
+    return go.Figure(
+        go.Pie(
+            labels=[LABELS[category] for category in RESEARCH_CATEGORIES],
+            marker_colors=color_list[:len(RESEARCH_CATEGORIES)],
+            hovertemplate=f'Category=%{{label}}<br>{value_name}=%{{value}}<extra></extra>'
+        )
+    ).update_layout(
+        title_text=title,
+        title_x=0.5,
+        showlegend=showlegend,
+        legend_tracegroupgap=0,
+        margin={'t': 60}
+    ).to_dict()
+
+
+# Category pie charts of all publications and of each organisation, by the column of their values
+category_pie_templates = {
+    'Total': category_pie_template('Total', 'Overall Distribution', True),
+    'Academia': category_pie_template('Academia', 'Academia', False),
+    'Company': category_pie_template('Company', 'Companies', False),
+    'Collaboration': category_pie_template('Collaboration', 'Collaborations', False)
+}
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""Configure gunicorn to load the data set once in the master process."""
+
+# The number of workers is set by the WEB_CONCURRENCY environment variable.
+
+import os
+
+from preload import preload, private_memory
+
+# Import the application before forking, so the workers share its memory pages
+preload_app = True
+# The chart callbacks of one filter change arrive as parallel requests, threads serve them at the same time
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+
+def on_starting(server):
+    """Freeze the preloaded data set and derived structures before the workers are forked."""
+    preload()
+    server.log.info('Preloaded data set, master memory: %s', private_memory())
+
+
+def post_worker_init(worker):
+    """Report how much memory of the forked worker is private."""
+    memory = private_memory()
+    worker.log.info('Worker %s private memory: %s kB (Pss %s kB, Rss %s kB)', worker.pid,
+                    memory.get('Private'), memory.get('Pss'), memory.get('Rss'))
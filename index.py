@@ -4,34 +4,44 @@
 # Run this app with `python index.py` and
 # visit http://127.0.0.1:8050/ in your web browser.
 
-import dash_core_components as dcc
-import dash_html_components as html
+import uuid
+
+from dash import dcc, html
 from dash.dependencies import Input, Output
 
 # Although server and callbacks are not used directly, they are still needed
-from app import app, server
+from app import app, dataset, server
 from layouts import analyses_layout, dataset_layout, description_layout
+from metrics import instrument
 import callbacks
 
-app.layout = html.Div([
-        dcc.Location(id='url', refresh=False),
-        html.Div(id='page-content')
-])
+
+def serve_layout():
+    """Create the layout on every page load, so every session gets its own id."""
+    return html.Div([
+            dcc.Location(id='url', refresh=False),
+            dcc.Store(id='session-id', data=uuid.uuid4().hex),
+            html.Div(id='page-content')
+    ])
+
+
+app.layout = serve_layout
 
 
 @app.callback(Output('page-content', 'children'),
               Input('url', 'pathname'))
+@instrument('display_page')
 def display_page(pathname):
     """Route to the desired page."""
     if pathname == '/':
-        return analyses_layout
+        return analyses_layout(dataset.snapshot)
     elif pathname == '/dataset':
         return dataset_layout
     elif pathname == '/description':
         return description_layout
     else:
         # the default
-        return analyses_layout
+        return analyses_layout(dataset.snapshot)
 
 
 # Run the application, if this python file is executed
@@ -1,265 +1,306 @@
 # -*- coding: utf-8 -*-
 """Define the layouts of the Dash application."""
 
-import dash_core_components as dcc
-import dash_html_components as html
+import functools
 import random
 
+from dash import dcc, html
+
 # Local import of the text strings
-from app import df
+from aggregates import encode_cube
 from constants import (LOADING_TYPE, COLOR_MAP, LABELS, RESEARCH_CATEGORIES, PANDASPROFILING_REPORT,
-                       SWEETVIZ_REPORT, HEADER_INTRO_TXT, DATASET_FEATURES_TXT, PROJECT_DESCRIPTION_TXT)
+                       SWEETVIZ_REPORT, HEADER_INTRO_TXT, DATASET_FEATURES_TXT, PROJECT_DESCRIPTION_TXT,
+                       CLIENTSIDE_FILTERING, LIVE_UPDATES, LIVE_UPDATE_DEBOUNCE)
+# The static parts of the figures, the callbacks only update their data
+from figures import base_map, category_pie_templates, histogram_template, pie_template
 
 
 # --- CALCULATIONS ---
 
-# Publication year range
-py_min = int(df['PY'].min())
-py_max = int(df['PY'].max())
-# This adds three dicts together to describe the markers of the year range:
-# There is marker every year with an empty label,
-# every five years there is a marker with the year as label
-# and there is the last year with a label
-year_range_marks = {
-    **{i: '' for i in range(py_min, py_max)},
-    **{i: str(i) for i in range(py_min, py_max, 5)},
-    **{py_max: str(py_max)}
-}
-
 loading_color = random.choice(list(COLOR_MAP.values()))
 
 
+def year_range_marks(py_min, py_max):
+    """Describe the markers of the year range slider."""
+    # This adds three dicts together to describe the markers of the year range:
+    # There is marker every year with an empty label,
+    # every five years there is a marker with the year as label
+    # and there is the last year with a label
+    return {
+        **{i: '' for i in range(py_min, py_max)},
+        **{i: str(i) for i in range(py_min, py_max, 5)},
+        **{py_max: str(py_max)}
+    }
+
+
 # --- ANALYSES ---
 
-analyses_layout = html.Div([
-        html.Div([
-                html.Div([
-                        html.H1(
-                            'Exploring the Diffusion of Publications Between Academia and Companies',
-                            id='main-title'
-                        ),
-                        html.H3(
-                            'in the Field of Deep Learning',
-                            id='subtitle'
-                        ),
-                    ],
-                    id='title'
-                )
-            ],
-            id='header',
-            className='row'
-        ),
-        html.Div([
-                html.Div([
-                        html.H6(
-                            HEADER_INTRO_TXT,
-                        )
-                    ],
-                    className='ten columns'
-                ),
-                html.Div([
-                        html.A(
-                            'Learn More',
-                            href='/description',
-                            id='learn-more-btn',
-                            role='button',
-                            className='button'
-                        ),
-                        html.A(
-                            'Explore Dataset',
-                            href='/dataset',
-                            id='explore-dataset-btn',
-                            role='button',
-                            className='button'
-                        )
-                    ],
-                    className='two columns item-column'
-                )
-            ],
-            id='header-description',
-            className='row flex-display pretty_container padded'
-        ),
-        html.Div([
-                html.Div([
-                        html.P(
-                            'Filter by research area (overlapping categories):',
-                            className='margin-b'
-                        ),
-                        html.P(
-                            'Filter by year published:'
-                        )
-                    ],
-                    className='three columns control_label'
-                ),
-                html.Div([
-                        dcc.Dropdown(
-                            id='category-filter',
-                            options=[{'label': LABELS[category], 'value': category}
-                                     for category in RESEARCH_CATEGORIES],
-                            multi=True,
-                            value=RESEARCH_CATEGORIES,
-                            className='dcc_control margin-b'
-                        ),
-                        dcc.RangeSlider(
-                            id='year-slider',
-                            marks=year_range_marks,
-                            min=py_min,
-                            max=py_max,
-                            value=[py_min, py_max],
-                            className='dcc_control'
-                        )
-                    ],
-                    className='seven columns'
-                ),
-                html.Div([
-                        html.Button(
-                            id='submit-button-state',
-                            n_clicks=0,
-                            children='Update Charts',
-                            className='button'
-                        )
-                    ],
-                    className='two columns item-column'
-                ),
-            ],
-            className='row flex-display pretty_container padded'
-        ),
-        html.Div([
-                html.Div([
-                        html.Div([
-                                dcc.Loading([
-                                        dcc.Graph(
-                                            id='histogram-year'
-                                        )
-                                    ],
-                                    type=LOADING_TYPE,
-                                    color=loading_color
-                                )
-                            ],
-                            className='pretty_container'
-                        )
-                    ],
-                    className='eight columns'
-                ),
-                html.Div([
-                        html.Div([
-                                dcc.Loading([
-                                        dcc.Graph(
-                                            id='pie-org'
-                                        )
-                                    ],
-                                    type=LOADING_TYPE,
-                                    color=loading_color
-                                )
-                            ],
-                            className='pretty_container'
-                        )
-                    ],
-                    className='four columns tight'
-                )
-            ],
-            className='row'
-        ),
-        html.Div([
-                html.H5(
-                    'Publication Ratio per Country',
-                    className='center-content margin-t'
-                )
-            ],
-            className='row'
-        ),
-        html.Div([
-                dcc.Tabs([
-                        dcc.Tab(label='Company vs Academia w/ Collab.', value='comp-acad-collab'),
-                        dcc.Tab(label='Company vs Academia', value='comp-acad'),
-                        dcc.Tab(label='Company vs Collaboration', value='comp-collab'),
-                        dcc.Tab(label='Collaboration vs Academia', value='collab-acad')
-                    ],
-                    id='map-tabs',
-                    value='comp-acad-collab'
-                ),
-                html.Div([
-                        dcc.Loading([
-                                dcc.Graph(
-                                    id='choropleth-map'
-                                )
-                            ],
-                            type=LOADING_TYPE,
-                            color=loading_color
-                        )
-                    ],
-                    id='map-container',
-                    className='pretty_container'
-                ),
-                html.Div(
-                    id='map-data',
-                    style={'display': 'none'}
-                )
-            ],
-            className='row'
-        ),
-        html.Div([
-                html.H5(
-                    'Distribution per Research Area',
-                    className='center-content margin-t'
-                )
-            ],
-            className='row'
-        ),
-        html.Div([
-                html.Div([
-                        dcc.Loading([
-                                dcc.Graph(
-                                    id='pie-cat-all'
-                                )
-                            ],
-                            type=LOADING_TYPE,
-                            color=loading_color
-                        )
-                    ],
-                    className='six columns'
-                ),
-                html.Div([
-                        dcc.Loading([
-                                dcc.Graph(
-                                    id='pie-cat-academia'
-                                )
-                            ],
-                            type=LOADING_TYPE,
-                            color=loading_color
-                        )
-                    ],
-                    className='two columns tight'
-                ),
-                html.Div([
-                        dcc.Loading([
-                                dcc.Graph(
-                                    id='pie-cat-companies'
-                                )
-                            ],
-                            type=LOADING_TYPE,
-                            color=loading_color
-                        )
-                    ],
-                    className='two columns tight'
-                ),
-                html.Div([
-                        dcc.Loading([
-                                dcc.Graph(
-                                    id='pie-cat-collaborations'
-                                )
-                            ],
-                            type=LOADING_TYPE,
-                            color=loading_color
-                        )
-                    ],
-                    className='two columns tight'
-                ),
-            ],
-            id='category-pies',
-            className='row flex-display pretty_container'
-        )
-])
+@functools.lru_cache(maxsize=1)
+def analyses_layout(snapshot):
+    """Build the analyses page of a data set snapshot, it is only rebuilt after the data set changed."""
+    # Publication year range
+    py_min, py_max = snapshot.years
+    # The charts are filtered in the browser, so the cube is sent once with the layout
+    client_cube = encode_cube(snapshot.cube) if CLIENTSIDE_FILTERING else None
+
+    return html.Div([
+            html.Div([
+                    html.Div([
+                            html.H1(
+                                'Exploring the Diffusion of Publications Between Academia and Companies',
+                                id='main-title'
+                            ),
+                            html.H3(
+                                'in the Field of Deep Learning',
+                                id='subtitle'
+                            ),
+                        ],
+                        id='title'
+                    )
+                ],
+                id='header',
+                className='row'
+            ),
+            html.Div([
+                    html.Div([
+                            html.H6(
+                                HEADER_INTRO_TXT,
+                            )
+                        ],
+                        className='ten columns'
+                    ),
+                    html.Div([
+                            html.A(
+                                'Learn More',
+                                href='/description',
+                                id='learn-more-btn',
+                                role='button',
+                                className='button'
+                            ),
+                            html.A(
+                                'Explore Dataset',
+                                href='/dataset',
+                                id='explore-dataset-btn',
+                                role='button',
+                                className='button'
+                            )
+                        ],
+                        className='two columns item-column'
+                    )
+                ],
+                id='header-description',
+                className='row flex-display pretty_container padded'
+            ),
+            html.Div([
+                    html.Div([
+                            html.P(
+                                'Filter by research area (overlapping categories):',
+                                className='margin-b'
+                            ),
+                            html.P(
+                                'Filter by year published:'
+                            )
+                        ],
+                        className='three columns control_label'
+                    ),
+                    html.Div([
+                            dcc.Dropdown(
+                                id='category-filter',
+                                options=[{'label': LABELS[category], 'value': category}
+                                         for category in RESEARCH_CATEGORIES],
+                                multi=True,
+                                value=RESEARCH_CATEGORIES,
+                                className='dcc_control margin-b'
+                            ),
+                            dcc.RangeSlider(
+                                id='year-slider',
+                                marks=year_range_marks(py_min, py_max),
+                                min=py_min,
+                                max=py_max,
+                                value=[py_min, py_max],
+                                # Live updates already start while dragging, the browser debounces the changes
+                                updatemode='drag' if LIVE_UPDATES and not CLIENTSIDE_FILTERING else 'mouseup',
+                                className='dcc_control'
+                            )
+                        ],
+                        className='seven columns'
+                    ),
+                    html.Div([
+                            html.Button(
+                                id='submit-button-state',
+                                n_clicks=0,
+                                children='Update Charts',
+                                className='button'
+                            ),
+                            dcc.Store(
+                                id='cube-data',
+                                data=client_cube
+                            ),
+                            # The filters of the live updates, set by the browser after the debounce delay
+                            dcc.Store(
+                                id='live-filters',
+                                data={'categories': RESEARCH_CATEGORIES, 'years': [py_min, py_max]}
+                            ),
+                            dcc.Store(
+                                id='live-debounce',
+                                data=int(LIVE_UPDATE_DEBOUNCE * 1000)
+                            )
+                        ],
+                        className='two columns item-column',
+                        # The charts update on every change of the filters in clientside filtering and live update mode
+                        style={'display': 'none'} if CLIENTSIDE_FILTERING or LIVE_UPDATES else None
+                    ),
+                ],
+                className='row flex-display pretty_container padded'
+            ),
+            html.Div([
+                    html.Div([
+                            html.Div([
+                                    dcc.Loading([
+                                            dcc.Graph(
+                                                id='histogram-year',
+                                                figure=histogram_template
+                                            )
+                                        ],
+                                        type=LOADING_TYPE,
+                                        color=loading_color
+                                    )
+                                ],
+                                className='pretty_container'
+                            )
+                        ],
+                        className='eight columns'
+                    ),
+                    html.Div([
+                            html.Div([
+                                    dcc.Loading([
+                                            dcc.Graph(
+                                                id='pie-org',
+                                                figure=pie_template
+                                            )
+                                        ],
+                                        type=LOADING_TYPE,
+                                        color=loading_color
+                                    )
+                                ],
+                                className='pretty_container'
+                            )
+                        ],
+                        className='four columns tight'
+                    )
+                ],
+                className='row'
+            ),
+            html.Div([
+                    html.H5(
+                        'Publication Ratio per Country',
+                        className='center-content margin-t'
+                    )
+                ],
+                className='row'
+            ),
+            html.Div([
+                    dcc.Tabs([
+                            dcc.Tab(label='Company vs Academia w/ Collab.', value='comp-acad-collab'),
+                            dcc.Tab(label='Company vs Academia', value='comp-acad'),
+                            dcc.Tab(label='Company vs Collaboration', value='comp-collab'),
+                            dcc.Tab(label='Collaboration vs Academia', value='collab-acad')
+                        ],
+                        id='map-tabs',
+                        value='comp-acad-collab'
+                    ),
+                    html.Div(
+                        # Shows the progress of the map, while it is drawn in a background process
+                        id='map-progress',
+                        className='center-content'
+                    ),
+                    html.Div([
+                            dcc.Loading([
+                                    dcc.Graph(
+                                        id='choropleth-map',
+                                        figure=base_map
+                                    )
+                                ],
+                                type=LOADING_TYPE,
+                                color=loading_color
+                            )
+                        ],
+                        id='map-container',
+                        className='pretty_container'
+                    ),
+                    html.Div(
+                        id='map-data',
+                        style={'display': 'none'}
+                    )
+                ],
+                className='row'
+            ),
+            html.Div([
+                    html.H5(
+                        'Distribution per Research Area',
+                        className='center-content margin-t'
+                    )
+                ],
+                className='row'
+            ),
+            html.Div([
+                    html.Div([
+                            dcc.Loading([
+                                    dcc.Graph(
+                                        id='pie-cat-all',
+                                        figure=category_pie_templates['Total']
+                                    )
+                                ],
+                                type=LOADING_TYPE,
+                                color=loading_color
+                            )
+                        ],
+                        className='six columns'
+                    ),
+                    html.Div([
+                            dcc.Loading([
+                                    dcc.Graph(
+                                        id='pie-cat-academia',
+                                        figure=category_pie_templates['Academia']
+                                    )
+                                ],
+                                type=LOADING_TYPE,
+                                color=loading_color
+                            )
+                        ],
+                        className='two columns tight'
+                    ),
+                    html.Div([
+                            dcc.Loading([
+                                    dcc.Graph(
+                                        id='pie-cat-companies',
+                                        figure=category_pie_templates['Company']
+                                    )
+                                ],
+                                type=LOADING_TYPE,
+                                color=loading_color
+                            )
+                        ],
+                        className='two columns tight'
+                    ),
+                    html.Div([
+                            dcc.Loading([
+                                    dcc.Graph(
+                                        id='pie-cat-collaborations',
+                                        figure=category_pie_templates['Collaboration']
+                                    )
+                                ],
+                                type=LOADING_TYPE,
+                                color=loading_color
+                            )
+                        ],
+                        className='two columns tight'
+                    ),
+                ],
+                id='category-pies',
+                className='row flex-display pretty_container'
+            )
+    ])
 
 
 # --- DATASET ---
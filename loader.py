@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Load the data set columns used by the dashboard."""
+
+# Run `python loader.py` after creating or updating the parquet file
+# to write the memory-mappable Arrow IPC file of the dashboard.
+
+import glob
+import hashlib
+import itertools
+import os
+import re
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from aggregates import concat_frames, index_frame
+from constants import DATASET_PATH, DATASET_IPC_PATH, RESEARCH_CATEGORIES
+
+# Columns of the data set which are used by the dashboard
+DASHBOARD_COLUMNS = ['PY', *RESEARCH_CATEGORIES, 'Organisation', 'CountryCode', 'Country']
+
+
+def to_arrow_table(frame):
+    """Convert an indexed frame to a table with Arrow-native integer and dictionary types."""
+    columns = {
+        'PY': pa.array(frame['PY'].to_numpy(), type=pa.uint16()),
+        **{category: pa.array(frame[category].to_numpy()) for category in RESEARCH_CATEGORIES},
+        'CategoryMask': pa.array(frame['CategoryMask'].to_numpy(), type=pa.uint8()),
+        # Strings are dictionary encoded, which is converted to categories again by pandas
+        **{column: pa.array(frame[column].astype('category')) for column in ['Organisation', 'CountryCode', 'Country']}
+    }
+    return pa.table(columns)
+
+
+def convert_dataset(parquet_path, ipc_path):
+    """Write the dashboard columns, sorted by year and with the category bitmask, as uncompressed Arrow IPC file."""
+    frame = index_frame(pd.read_parquet(parquet_path, columns=DASHBOARD_COLUMNS))
+    # An uncompressed file can be memory-mapped without decompressing it in every worker
+    feather.write_feather(to_arrow_table(frame), ipc_path, compression='uncompressed')
+
+
+def load_dataset(parquet_path, ipc_path):
+    """Load the dashboard columns, memory-mapped from the Arrow IPC file if it is up to date."""
+    if os.path.exists(ipc_path) and (not os.path.exists(parquet_path)
+                                     or os.path.getmtime(ipc_path) >= os.path.getmtime(parquet_path)):
+        table = feather.read_table(ipc_path, memory_map=True)
+        # Numeric columns without nulls stay zero-copy views of the mapped file,
+        # so all workers share the same page cache pages
+        return index_frame(table.to_pandas(split_blocks=True))
+    return index_frame(pd.read_parquet(parquet_path, columns=DASHBOARD_COLUMNS))
+
+
+def parquet_files(path):
+    """List the parquet file or the parquet files of a directory, which is appended to by adding files."""
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, '**', '*.parquet'), recursive=True))
+    return [path] if os.path.exists(path) else []
+
+
+def file_signature(path):
+    """Describe the parquet files by their modification time and size, which is cheap to check."""
+    return tuple((file, os.stat(file).st_mtime_ns, os.stat(file).st_size) for file in parquet_files(path))
+
+
+def row_groups(path):
+    """List the row groups of the parquet files as (file, index, checksum of its metadata)."""
+    parts = []
+    for file in parquet_files(path):
+        # Only the footer of the file is read
+        metadata = pq.ParquetFile(file).metadata
+        for index in range(metadata.num_row_groups):
+            checksum = hashlib.sha1(repr(metadata.row_group(index).to_dict()).encode()).hexdigest()
+            parts.append((file, index, checksum))
+    return parts
+
+
+def read_row_groups(parts, columns=None):
+    """Read the listed row groups of the parquet files."""
+    frames = [pq.ParquetFile(file).read_row_groups([index for _, index, _ in group], columns=columns).to_pandas()
+              for file, group in itertools.groupby(parts, key=lambda part: part[0])]
+    return concat_frames(frames)
+
+
+def year_range_of(path):
+    """Find the first and the last year of the data set from the row group statistics, without reading the rows."""
+    years = []
+    for file in parquet_files(path):
+        metadata = pq.ParquetFile(file).metadata
+        if 'PY' not in metadata.schema.names:
+            # Partitioned by year, the year only is in the directory name
+            years.append(int(re.search(r'PY=(\d+)', file).group(1)))
+            continue
+        column = metadata.schema.names.index('PY')
+        for index in range(metadata.num_row_groups):
+            statistics = metadata.row_group(index).column(column).statistics
+            if statistics is None or not statistics.has_min_max:
+                # Written without statistics, so the years of the file have to be read
+                file_years = pq.read_table(file, columns=['PY'])['PY'].to_numpy()
+                years.extend([file_years.min(), file_years.max()])
+                break
+            years.extend([statistics.min, statistics.max])
+    return int(min(years)), int(max(years))
+
+
+def scan_years(path, year_range, columns, batch_size=1000000):
+    """Read the rows of a year range in batches, only the row groups and partitions of these years are read."""
+    dataset = ds.dataset(path, format='parquet', partitioning='hive')
+    # The filter is pushed down to the row group statistics and the partition directories
+    condition = (ds.field('PY') >= int(year_range[0])) & (ds.field('PY') <= int(year_range[1]))
+    empty = True
+    for batch in dataset.to_batches(columns=columns, filter=condition, batch_size=batch_size):
+        empty = False
+        yield batch.to_pandas()
+    if empty:
+        yield dataset.schema.empty_table().select(columns).to_pandas()
+
+
+# Convert the data set, if this python file is executed
+if __name__ == '__main__':
+    convert_dataset(DATASET_PATH, DATASET_IPC_PATH)
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""Define the latency and payload instrumentation of the callbacks."""
+
+import cProfile
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+# Upper bounds of the latency histogram buckets in seconds
+BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+# Only every n-th response of a callback is split into the sizes of its outputs, which needs to parse it
+OUTPUT_SAMPLE_INTERVAL = 20
+
+
+class Metrics:
+    """Registry of the callback phase durations and the response payload sizes of this worker."""
+
+    def __init__(self):
+        self._durations = defaultdict(lambda: [0, 0.0, [0] * len(BUCKETS)])
+        self._payloads = defaultdict(lambda: [0, 0])
+        self._lock = threading.Lock()
+
+    def observe_duration(self, callback, phase, seconds):
+        """Count the duration of a callback phase in the histogram."""
+        with self._lock:
+            entry = self._durations[callback, phase]
+            entry[0] += 1
+            entry[1] += seconds
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    entry[2][i] += 1
+
+    def observe_payload(self, callback, output, size):
+        """Count the size of a response payload in bytes."""
+        with self._lock:
+            entry = self._payloads[callback, output]
+            entry[0] += 1
+            entry[1] += size
+
+    def render(self, cache_stats=None):
+        """Render all metrics in the Prometheus text format."""
+        lines = [
+            '# HELP dashboard_callback_seconds Duration of the callback phases.',
+            '# TYPE dashboard_callback_seconds histogram'
+        ]
+        with self._lock:
+            for (callback, phase), (count, total, buckets) in sorted(self._durations.items()):
+                labels = f'callback="{callback}",phase="{phase}"'
+                for bound, bucket_count in zip(BUCKETS, buckets):
+                    lines.append(f'dashboard_callback_seconds_bucket{{{labels},le="{bound}"}} {bucket_count}')
+                lines.append(f'dashboard_callback_seconds_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f'dashboard_callback_seconds_sum{{{labels}}} {total}')
+                lines.append(f'dashboard_callback_seconds_count{{{labels}}} {count}')
+            lines.append('# HELP dashboard_payload_bytes Size of the callback responses (total) '
+                         'and of a sample of their outputs.')
+            lines.append('# TYPE dashboard_payload_bytes summary')
+            for (callback, output), (count, total) in sorted(self._payloads.items()):
+                labels = f'callback="{callback}",output="{output}"'
+                lines.append(f'dashboard_payload_bytes_sum{{{labels}}} {total}')
+                lines.append(f'dashboard_payload_bytes_count{{{labels}}} {count}')
+        if cache_stats:
+            for name in ['hits', 'misses', 'evictions']:
+                lines.append(f'# TYPE dashboard_figure_cache_{name}_total counter')
+                lines.append(f'dashboard_figure_cache_{name}_total {cache_stats[name]}')
+            lines.append('# TYPE dashboard_figure_cache_bytes gauge')
+            lines.append(f'dashboard_figure_cache_bytes {cache_stats["bytes"]}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+# Phase durations of the callbacks running in this thread, the innermost last
+_local = threading.local()
+
+
+def _running():
+    """Return the stack of the phase durations of the callbacks running in this thread."""
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+@contextmanager
+def phase(name):
+    """Add the duration of a phase (filter, aggregate, figure) to the innermost running callback."""
+    stack = _running()
+    phases = stack[-1] if stack else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if phases is not None:
+            phases[name] += time.perf_counter() - start
+
+
+def profiling_requested():
+    """Check if the request opted in to profiling, which also needs the PROFILE_DIR environment variable."""
+    return (bool(os.environ.get('PROFILE_DIR')) and has_request_context()
+            and (request.headers.get('X-Profile') == '1' or request.cookies.get('profile') == '1'))
+
+
+def instrument(name):
+    """Decorate a callback to record its phase durations, nested callbacks leave the response to the outer one."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            stack = _running()
+            outermost = not stack
+            stack.append(defaultdict(float))
+            # Only the outermost callback is profiled, a nested profiler can not be enabled
+            profiler = cProfile.Profile() if outermost and profiling_requested() else None
+            start = time.perf_counter()
+            try:
+                return profiler.runcall(func, *args) if profiler else func(*args)
+            finally:
+                duration = time.perf_counter() - start
+                for phase_name, seconds in stack.pop().items():
+                    metrics.observe_duration(name, phase_name, seconds)
+                metrics.observe_duration(name, 'total', duration)
+                if profiler:
+                    profiler.dump_stats(os.path.join(
+                        os.environ['PROFILE_DIR'], f'{name}-{os.getpid()}-{time.time():.0f}.prof'))
+                if outermost and has_request_context():
+                    # The payload and the serialization are measured after the response is built
+                    g.metrics_callback = name
+                    g.metrics_callback_end = time.perf_counter()
+        return wrapper
+    return decorator
+
+
+def install(server):
+    """Measure the serialization time and the payload of every callback response of the Flask server."""
+    responses = defaultdict(itertools.count)
+
+    @server.after_request
+    def record_response(response):
+        callback = g.get('metrics_callback')
+        if callback is None or response.direct_passthrough:
+            return response
+        # Dash encodes the outputs after the callback returned, the hooks before the callback are not counted
+        metrics.observe_duration(callback, 'serialize', time.perf_counter() - g.metrics_callback_end)
+        body = response.get_data()
+        metrics.observe_payload(callback, 'total', len(body))
+        if next(responses[callback]) % OUTPUT_SAMPLE_INTERVAL:
+            return response
+        try:
+            outputs = json.loads(body)['response']
+        except (ValueError, KeyError, TypeError):
+            return response
+        for component_id, props in outputs.items():
+            for prop, value in props.items():
+                metrics.observe_payload(callback, f'{component_id}.{prop}', len(json.dumps(value)))
+        return response
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Prepare the data set in the gunicorn master process before the workers are forked."""
+
+import gc
+
+import numpy as np
+
+SMAPS_ROLLUP_PATH = '/proc/self/smaps_rollup'
+
+
+def freeze_frame(frame):
+    """Mark the NumPy buffers of a frame or series as read-only, so writes fail instead of copying shared pages."""
+    for block in frame._mgr.blocks:
+        values = block.values
+        # Categorical columns keep their codes in _codes, other NumPy-backed extension arrays in _ndarray
+        values = getattr(values, '_codes', getattr(values, '_ndarray', values))
+        if isinstance(values, np.ndarray):
+            values.flags.writeable = False
+    return frame
+
+
+def preload():
+    """Load the data set and build the derived structures once, before the workers are forked."""
+    # Importing the application loads the data set, the cube and the lookup tables
+    import app
+    import index  # noqa: F401 (registers the layout and the callbacks)
+    snapshot = app.dataset.snapshot
+    for structure in (snapshot.frame, snapshot.cube, snapshot.country_names):
+        # The arrow and duckdb engines keep neither the rows nor the cube
+        if structure is not None:
+            freeze_frame(structure)
+    if app.background_manager is not None:
+        # Every worker opens its own connection to the job queue, SQLite connections must not cross a fork
+        app.background_manager.handle.close()
+    # Move all objects into the permanent generation, so the garbage collector
+    # of a worker does not write to their headers and trigger copy-on-write
+    gc.collect()
+    gc.freeze()
+
+
+def private_memory():
+    """Report the memory of this process in kB, private pages are not shared with the other workers."""
+    memory = {}
+    try:
+        with open(SMAPS_ROLLUP_PATH) as file:
+            for line in file:
+                name, _, value = line.partition(':')
+                if value.strip().endswith('kB'):
+                    memory[name] = int(value.split()[0])
+    except OSError:
+        # Only available on Linux
+        return {}
+    memory['Private'] = memory.get('Private_Clean', 0) + memory.get('Private_Dirty', 0)
+    return memory
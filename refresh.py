@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Define the incremental refresh of the data set, which replaces it without restarting the application."""
+
+import threading
+import time
+
+from engines import make_engine
+from loader import file_signature, row_groups
+
+
+class DatasetHolder:
+    """Hold the current snapshot of the data set and replace it, when the parquet data changed."""
+
+    def __init__(self, parquet_path, ipc_path, interval, engine='pandas'):
+        self.parquet_path = parquet_path
+        self.interval = interval
+        self.refreshes = 0
+        self._signature = file_signature(parquet_path)
+        # The snapshot is the query engine of the data set, which keeps the data or reads it on demand
+        self.snapshot = make_engine(engine, parquet_path, ipc_path, row_groups(parquet_path))
+        self._checked = time.monotonic()
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Load the row groups added since the last refresh and swap the snapshot, return if it was replaced."""
+        with self._lock:
+            signature = file_signature(self.parquet_path)
+            if signature == self._signature:
+                return False
+            snapshot = self.snapshot.refreshed(self.parquet_path, row_groups(self.parquet_path))
+            self._signature = signature
+            if snapshot is self.snapshot:
+                return False
+            # Replacing the reference is atomic, the callbacks take the snapshot once at their start
+            # (callbacks.with_snapshot) and keep using it, so a request never mixes two versions
+            self.snapshot = snapshot
+            self.refreshes += 1
+            return True
+
+    def maybe_refresh(self):
+        """Refresh in a background thread, if the check interval passed and the parquet files changed."""
+        if not self.interval or time.monotonic() - self._checked < self.interval:
+            return
+        self._checked = time.monotonic()
+        if not self._lock.locked() and file_signature(self.parquet_path) != self._signature:
+            # Requests are not delayed, they are served from the current snapshot until the swap
+            threading.Thread(target=self.refresh, daemon=True).start()
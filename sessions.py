@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Define the tracking of the live update requests of every session."""
+
+import itertools
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from dash.exceptions import PreventUpdate
+
+# The request of the current thread, which checkpoints test for staleness
+_local = threading.local()
+
+
+class SessionRequests:
+    """Drop the requests of every session, which are superseded by a newer request."""
+
+    def __init__(self, max_sessions=10000):
+        self.max_sessions = max_sessions
+        self.dropped = 0
+        self._latest = OrderedDict()
+        self._conditions = {}
+        self._running = set()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def _register(self, session_id):
+        """Make a request the newest one of its session."""
+        with self._lock:
+            sequence = next(self._counter)
+            self._latest[session_id] = sequence
+            self._latest.move_to_end(session_id)
+            condition = self._conditions.setdefault(session_id, threading.Condition(self._lock))
+            # The request waiting for the session is stale now, it leaves at once
+            condition.notify_all()
+            # Forget the least recently active sessions
+            while len(self._latest) > self.max_sessions:
+                old_session, _ = self._latest.popitem(last=False)
+                self._conditions.pop(old_session, None)
+        return sequence, condition
+
+    def is_stale(self, session_id, sequence):
+        """Check if a newer request of the session arrived."""
+        return self._latest.get(session_id) != sequence
+
+    def _drop_if_stale(self, session_id, sequence):
+        """Stop the request without updating the charts, if it is stale."""
+        if self.is_stale(session_id, sequence):
+            self.dropped += 1
+            raise PreventUpdate
+
+    @contextmanager
+    def latest(self, session_id):
+        """Run the body only if it still is the newest request of its session, one request per session at a time."""
+        # The browser debounces the changes, so the request starts at once and no thread waits for further changes
+        sequence, condition = self._register(session_id)
+        with condition:
+            # A running older request of the session stops at its next checkpoint. Only the newest request waits
+            # for it, so a session occupies at most two threads, one of them waiting.
+            while condition in self._running and not self.is_stale(session_id, sequence):
+                condition.wait()
+            self._drop_if_stale(session_id, sequence)
+            self._running.add(condition)
+        _local.request = (self, session_id, sequence)
+        try:
+            yield
+        finally:
+            _local.request = None
+            with condition:
+                self._running.discard(condition)
+                condition.notify_all()
+
+
+def checkpoint():
+    """Cancel the running computation between its steps, if a newer request of the same session arrived."""
+    request = getattr(_local, 'request', None)
+    if request is not None:
+        requests, session_id, sequence = request
+        requests._drop_if_stale(session_id, sequence)
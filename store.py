@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Define the server-side stores of intermediate results."""
+
+import os
+import threading
+import time
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+
+class MemoryStore:
+    """Store of data frames with a time to live, private to the worker process."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def put(self, token, frame):
+        """Save a frame under a token."""
+        with self._lock:
+            self._expire()
+            self._entries[token] = (time.monotonic() + self.ttl, frame)
+
+    def get(self, token):
+        """Return the frame of a token or None, if it is unknown or expired."""
+        with self._lock:
+            entry = self._entries.get(token)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def _expire(self):
+        """Remove all expired entries."""
+        now = time.monotonic()
+        for token in [token for token, (expires, _) in self._entries.items() if expires < now]:
+            del self._entries[token]
+
+
+class FileStore:
+    """Store of data frames as Arrow IPC files in a directory shared by all workers."""
+
+    def __init__(self, directory, ttl):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, token):
+        """Map a token to its file name."""
+        return os.path.join(self.directory, f'{token}.arrow')
+
+    def put(self, token, frame):
+        """Save a frame under a token."""
+        self._expire()
+        path = self._path(token)
+        # Write to a temporary file first, so other workers never read a partial file
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        feather.write_feather(pa.Table.from_pandas(frame, preserve_index=False), temp_path,
+                              compression='uncompressed')
+        os.replace(temp_path, path)
+
+    def get(self, token):
+        """Return the frame of a token or None, if it is unknown or expired."""
+        path = self._path(token)
+        try:
+            if os.path.getmtime(path) + self.ttl < time.time():
+                return None
+            return feather.read_feather(path, memory_map=True)
+        except (OSError, pa.ArrowInvalid):
+            return None
+
+    def _expire(self):
+        """Delete all expired files."""
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.name.endswith('.arrow') and entry.stat().st_mtime + self.ttl < now:
+                    os.remove(entry.path)
+            except OSError:
+                # Another worker already deleted it
+                pass
+
+
+def make_store(mode, directory, ttl):
+    """Create the result store for the configured mode."""
+    if mode == 'memory':
+        return MemoryStore(ttl)
+    elif mode == 'file':
+        return FileStore(directory, ttl)
+    raise ValueError(f"Unknown store mode '{mode}', use 'memory' or 'file'")
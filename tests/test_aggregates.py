@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Test the aggregates of the charts."""
+
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aggregates import CATEGORY_BITS, count_category_organisations  # noqa: E402
+from constants import ORGANISATIONS, RESEARCH_CATEGORIES  # noqa: E402
+
+
+def make_cells(rows, categorical):
+    """Build cells of the cube from (categories, organisation, count) rows."""
+    cells = pd.DataFrame({
+        'CategoryMask': np.array([sum(CATEGORY_BITS[category] for category in categories)
+                                  for categories, _, _ in rows], dtype=np.uint8),
+        'PY': 1990,
+        'Organisation': [organisation for _, organisation, _ in rows],
+        'CountryCode': 'FRA',
+        'Count': [count for _, _, count in rows]
+    })
+    if categorical:
+        cells['Organisation'] = pd.Categorical(cells['Organisation'], categories=ORGANISATIONS)
+    return cells
+
+
+def test_category_without_cells_counts_zero():
+    """A category without cells in the selection has zero counts instead of NaN."""
+    empty_category = RESEARCH_CATEGORIES[0]
+    others = RESEARCH_CATEGORIES[1:]
+    rows = [(others, 'Academia', 2), (others[:1], 'Company', 1)]
+    for categorical in (False, True):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', FutureWarning)
+            counts = count_category_organisations(make_cells(rows, categorical))
+        assert list(counts.index) == RESEARCH_CATEGORIES
+        assert list(counts.columns) == ORGANISATIONS + ['Total']
+        assert not counts.isna().any().any()
+        assert counts.loc[empty_category].tolist() == [0, 0, 0, 0]
+        assert counts.loc[others[0]].tolist() == [2, 1, 0, 3]
+        assert counts.loc[others[1], 'Academia'] == 2
+
+
+def test_no_cells_counts_zero():
+    """An empty selection has zero counts for all categories."""
+    counts = count_category_organisations(make_cells([], categorical=False))
+    assert (counts.to_numpy() == 0).all()
+    assert counts.shape == (len(RESEARCH_CATEGORIES), len(ORGANISATIONS) + 1)